@@ -0,0 +1,188 @@
+"""
+Admission control for the voting backend.
+
+Token buckets cap the request rate globally and per voting session, with
+separate session buckets for voting and for read-only requests (vote counts,
+results) so polling clients cannot starve voters. A bounded semaphore caps how
+many requests may talk to the nilDB nodes at once.
+Requests over the limits are rejected immediately with a `Retry-After` hint
+instead of queueing until every node call times out.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request cannot be admitted.
+
+    Attributes:
+        retry_after (float): Seconds the client should wait before retrying
+        status_code (int): 429 for rate limits, 503 when node I/O is saturated
+    """
+
+    def __init__(self, message: str, retry_after: float, status_code: int = 429):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+    @property
+    def retry_after_header(self) -> str:
+        """Value for the HTTP `Retry-After` header (whole seconds, at least 1)."""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Attributes:
+        rate (float): Tokens added per second
+        capacity (float): Maximum number of stored tokens (burst size)
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens if available.
+
+        Returns:
+            float: 0 if the tokens were granted, otherwise the number of
+            seconds until they will be available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def refund(self, tokens: float = 1.0) -> None:
+        """Return tokens taken by a request that was rejected elsewhere."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def idle_since(self, now: float) -> float:
+        """Seconds since the bucket was last used."""
+        return now - self._updated
+
+
+VOTE = "vote"
+READ = "read"
+
+
+class AdmissionController:  # pylint: disable=too-many-instance-attributes
+    """
+    Global and per-session rate limiting plus a bound on concurrent node I/O.
+
+    Session buckets are created on first use and dropped once they have been
+    idle for `idle_timeout` seconds, so ended sessions do not accumulate.
+
+    Attributes:
+        max_concurrent_io (int): Requests allowed to talk to nilDB at once
+        queue_timeout (float): Seconds a request may wait for an I/O slot
+        idle_timeout (float): Seconds after which an unused session bucket
+            is discarded
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        global_rate: float = 200.0,
+        global_burst: float = 400.0,
+        session_rate: float = 50.0,
+        session_burst: float = 100.0,
+        read_rate: float = 10.0,
+        read_burst: float = 20.0,
+        max_concurrent_io: int = 32,
+        queue_timeout: float = 0.5,
+        idle_timeout: float = 600.0,
+    ):
+        self.max_concurrent_io = max_concurrent_io
+        self.queue_timeout = queue_timeout
+        self.idle_timeout = idle_timeout
+        self._global = TokenBucket(global_rate, global_burst)
+        self._limits = {
+            VOTE: (session_rate, session_burst),
+            READ: (read_rate, read_burst),
+        }
+        self._sessions: Dict[Tuple[str, str], TokenBucket] = {}
+        self._sessions_lock = threading.Lock()
+        self._last_prune = time.monotonic()
+        self._io_slots = threading.BoundedSemaphore(max_concurrent_io)
+
+    def _session_bucket(self, session_id: str, kind: str) -> TokenBucket:
+        with self._sessions_lock:
+            self._prune_unlocked()
+            bucket = self._sessions.get((kind, session_id))
+            if bucket is None:
+                bucket = TokenBucket(*self._limits[kind])
+                self._sessions[(kind, session_id)] = bucket
+            return bucket
+
+    def _prune_unlocked(self) -> None:
+        """Drop idle session buckets, at most once per half `idle_timeout`."""
+        now = time.monotonic()
+        if now - self._last_prune < self.idle_timeout / 2:
+            return
+        self._last_prune = now
+        idle = [
+            key for key, bucket in self._sessions.items()
+            if bucket.idle_since(now) >= self.idle_timeout
+        ]
+        for key in idle:
+            del self._sessions[key]
+
+    def admit(self, session_id: Optional[str] = None, kind: str = VOTE) -> None:
+        """
+        Charge one request against the session and global rate limits.
+
+        Args:
+            session_id (str, optional): Session the request belongs to
+            kind (str): `VOTE` or `READ`; each has its own session bucket
+
+        Raises:
+            Overloaded: If either limit is exhausted
+        """
+        session_bucket = None
+        if session_id is not None:
+            session_bucket = self._session_bucket(session_id, kind)
+            wait = session_bucket.try_acquire()
+            if wait:
+                raise Overloaded("Too many requests for this session.", wait)
+        wait = self._global.try_acquire()
+        if wait:
+            # A global rejection must not use up the session's allowance
+            if session_bucket is not None:
+                session_bucket.refund()
+            raise Overloaded("Too many requests.", wait)
+
+    @contextmanager
+    def node_io(self):
+        """
+        Hold one of the bounded node I/O slots for the duration of the block.
+
+        Raises:
+            Overloaded: If no slot frees up within `queue_timeout`
+        """
+        if not self._io_slots.acquire(timeout=self.queue_timeout):
+            raise Overloaded(
+                "Server is busy, please retry.", self.queue_timeout * 2, status_code=503
+            )
+        try:
+            yield
+        finally:
+            self._io_slots.release()
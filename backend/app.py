@@ -5,13 +5,18 @@ import uuid
 import json
 import sys
 import os
+import threading
 
 # root project path to sys.path
 sys.path.append(str(Path(__file__).parent.parent))
 
+from backend.admission import READ, AdmissionController, Overloaded
 from examples.init_schema import run_init_schema
-from examples.upload_vote import run_upload_vote
-from examples.get_results import run_get_results
+from examples.upload_vote import run_has_voted, run_read_voter_ids, run_upload_vote
+from examples.get_results import run_get_results, run_get_vote_count
+from nilrag.ballots import BALLOT_TYPES, PLURALITY
+from nilrag.bloom import BloomFilter
+from nilrag.config import ConfigStore
 
 app = Flask(__name__, static_folder="../frontend")
 CORS(app)
@@ -19,6 +24,109 @@ CORS(app)
 # In-memory storage for sessions
 sessions = {}
 
+# Node list and organization key shared by all elections. Each election gets
+# its own copy with its schema IDs, tokens and threshold, so creating one
+# election never changes where another one's votes go.
+BASE_CONFIG = "examples/bvote_config_voting.json"
+
+def session_config_path(session_id):
+    return f"examples/bvote_config_{session_id}.json"
+
+# Rate limits and the bound on concurrent nilDB requests (overridable via env)
+admission = AdmissionController(
+    global_rate=float(os.environ.get("BVOTE_GLOBAL_RATE", 200)),
+    global_burst=float(os.environ.get("BVOTE_GLOBAL_BURST", 400)),
+    session_rate=float(os.environ.get("BVOTE_SESSION_RATE", 50)),
+    session_burst=float(os.environ.get("BVOTE_SESSION_BURST", 100)),
+    read_rate=float(os.environ.get("BVOTE_READ_RATE", 10)),
+    read_burst=float(os.environ.get("BVOTE_READ_BURST", 20)),
+    max_concurrent_io=int(os.environ.get("BVOTE_MAX_NODE_IO", 32)),
+    queue_timeout=float(os.environ.get("BVOTE_QUEUE_TIMEOUT", 0.5)),
+    idle_timeout=float(os.environ.get("BVOTE_SESSION_IDLE_TIMEOUT", 600)),
+)
+
+# Per-session Bloom filters of voter IDs that have already voted. A miss lets
+# a vote skip the duplicate check on the nodes; a hit is confirmed with the
+# nodes before the vote is rejected. The filters live in this process, so a
+# miss is only authoritative with a single backend worker: set
+# BVOTE_TRUST_VOTER_FILTER=0 when running several workers.
+voter_filters = {}
+# Voters whose upload is in flight, kept across filter rebuilds
+pending_voters = {}
+voter_filters_lock = threading.Lock()
+VOTER_FILTER_CAPACITY = int(os.environ.get("BVOTE_VOTER_FILTER_CAPACITY", 1_000_000))
+VOTER_FILTER_ERROR_RATE = float(os.environ.get("BVOTE_VOTER_FILTER_ERROR_RATE", 1e-3))
+TRUST_VOTER_FILTER = os.environ.get("BVOTE_TRUST_VOTER_FILTER", "1") != "0"
+
+def install_voter_filter(session_id, voter_filter):
+    """Replace a session's voter filter, keeping the voters still in flight.
+
+    The caller must hold `voter_filters_lock`.
+    """
+    for voter_id in pending_voters.setdefault(session_id, set()):
+        voter_filter.add(voter_id)
+    voter_filters[session_id] = voter_filter
+    return voter_filter
+
+def rebuild_voter_filter(session_id):
+    """Rebuild a session's voter filter from the voter IDs stored on the nodes.
+
+    The caller must hold `voter_filters_lock`, so votes cannot be added to
+    the old filter while it is being replaced.
+    """
+    voter_ids = run_read_voter_ids(config_path=sessions[session_id]["config_path"])
+    return install_voter_filter(
+        session_id,
+        BloomFilter.from_items(
+            voter_ids,
+            max(VOTER_FILTER_CAPACITY, len(voter_ids)),
+            VOTER_FILTER_ERROR_RATE,
+        ),
+    )
+
+def get_voter_filter_locked(session_id):
+    """Return a session's voter filter, rebuilding it if missing.
+
+    The caller must hold `voter_filters_lock`.
+    """
+    if session_id not in voter_filters:
+        return rebuild_voter_filter(session_id)
+    return voter_filters[session_id]
+
+def reserve_voter(session_id, voter_id):
+    """
+    Mark a voter as voting in this session.
+
+    Returns None if the voter already has a vote in flight, otherwise
+    whether the filter reports that they may have voted before.
+    """
+    with voter_filters_lock:
+        voter_filter = get_voter_filter_locked(session_id)
+        pending = pending_voters.setdefault(session_id, set())
+        if voter_id in pending:
+            return None
+        seen = voter_id in voter_filter
+        voter_filter.add(voter_id)
+        pending.add(voter_id)
+        return seen
+
+def release_voter(session_id, voter_id):
+    """Clear a voter's in-flight mark once their upload has finished."""
+    with voter_filters_lock:
+        pending_voters.get(session_id, set()).discard(voter_id)
+
+def is_positive_int(value):
+    # bool is an int subclass, but `true` is not a valid count
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 1
+
+@app.errorhandler(Overloaded)
+def handle_overloaded(e):
+    # Fast rejection with a retry hint instead of piling up on the nodes
+    response = jsonify(message=str(e))
+    response.status_code = e.status_code
+    response.headers["Retry-After"] = e.retry_after_header
+    return response
+
 @app.route('/')
 def serve_index():
     return send_file(Path(app.static_folder) / 'index.html')
@@ -33,22 +141,66 @@ def serve_vote(session_id):
 def init():
     data = request.get_json()
     slots = data.get("slots", 5)
+    if not is_positive_int(slots):
+        return jsonify(message="slots must be a positive integer."), 400
     slot_names = data.get("slot_names", [f"Option {i+1}" for i in range(slots)])
     question = data.get("question", "Secret Voting")
+    ballot_type = data.get("ballot_type", PLURALITY)
+    if ballot_type not in BALLOT_TYPES:
+        return jsonify(message=f"Unknown ballot type '{ballot_type}'."), 400
+    shards = data.get("shards", 1)
+    if not is_positive_int(shards):
+        return jsonify(message="shards must be a positive integer."), 400
+    max_choices = data.get("max_choices")
+    if max_choices is not None and not (is_positive_int(max_choices) and max_choices <= slots):
+        return jsonify(message=f"max_choices must be an integer between 1 and {slots}."), 400
+    max_score = data.get("max_score")
+    if max_score is not None and not is_positive_int(max_score):
+        return jsonify(message="max_score must be a positive integer."), 400
+    threshold = data.get("threshold")
+    if threshold is not None and not (is_positive_int(threshold) and threshold >= 2):
+        return jsonify(message="threshold must be an integer of at least 2."), 400
 
     # Generate a unique session ID for this voting session
     session_id = str(uuid.uuid4())
 
-    # Initialize the schema and generate the config file
-    config_path = "examples/bvote_config_voting.json"  # Ensure this matches your expected config path
-    message = run_init_schema(slots=slots, config_path=config_path)
+    # Initialize the schema and generate the election's config file
+    config_path = session_config_path(session_id)
+    n_nodes = len(ConfigStore(BASE_CONFIG).read()["nodes"])
+    if threshold is not None and threshold > n_nodes:
+        return jsonify(message=f"threshold must be at most the number of nodes ({n_nodes})."), 400
+    admission.admit()
+    with admission.node_io():
+        message = run_init_schema(
+            slots=slots,
+            config_path=BASE_CONFIG,
+            ballot_type=ballot_type,
+            shards=shards,
+            threshold=threshold,
+            election_config_path=config_path,
+        )
 
     # Store session data (slot names and initial votes)
     sessions[session_id] = {
         "voting_open": True, # Track if voting is still open
-        "question": question
+        "config_path": config_path,
+        "question": question,
+        "slots": slots,
+        "ballot_type": ballot_type,
+        # Ballot limits used to validate votes (see nilrag.ballots.encode_ballot)
+        "ballot_options": {
+            "max_choices": max_choices,
+            "max_score": max_score,
+        },
     }
 
+    # Nobody has voted in a fresh election yet
+    with voter_filters_lock:
+        install_voter_filter(
+            session_id,
+            BloomFilter.for_capacity(VOTER_FILTER_CAPACITY, VOTER_FILTER_ERROR_RATE),
+        )
+
     # Store slot names in a separate file (optional)
     with open(f"examples/slot_names_{session_id}.txt", "w") as f:
         f.write("\n".join(slot_names))
@@ -69,10 +221,33 @@ def vote(session_id):
     voter_id = data["voter_id"]
     vote_choice = data["choice"]
 
+    admission.admit(session_id)
     try:
-        message = run_upload_vote(voter_id, vote_choice, config_path="examples/bvote_config_voting.json")
+        with admission.node_io():
+            seen = reserve_voter(session_id, voter_id)
+            if seen is None:
+                return jsonify(message=f"Voter {voter_id} has already voted.")
+            try:
+                # Only a filter hit needs the authoritative check on the nodes,
+                # unless the filter is not shared by every worker
+                if seen and run_has_voted(voter_id, config_path=session["config_path"]):
+                    return jsonify(message=f"Voter {voter_id} has already voted.")
+                message = run_upload_vote(
+                    voter_id,
+                    vote_choice,
+                    config_path=session["config_path"],
+                    ballot_type=session["ballot_type"],
+                    check_duplicate=not (seen or TRUST_VOTER_FILTER),
+                    n_slots=session["slots"],
+                    **session["ballot_options"],
+                )
+            finally:
+                release_voter(session_id, voter_id)
         return jsonify(message=message)
 
+    except Overloaded:
+        raise
+
     except ValueError as e:
         print(f"Known error: {e}")
         return jsonify(message=str(e)), 200
@@ -80,12 +255,29 @@ def vote(session_id):
         print(f"Unexpected error: {e}")
         return jsonify(message="Internal server error."), 500
 
+# Rebuild the voter filter from the voter IDs stored on the nodes. Filters
+# cannot be uploaded: a miss skips the duplicate check, so an imported filter
+# could let voters vote again.
+@app.route("/voter-filter/<session_id>", methods=["POST"])
+def rebuild_voter_filter_route(session_id):
+    if session_id not in sessions:
+        return jsonify(message="Session not found."), 404
+    if request.data:
+        return jsonify(message="Voter filters can only be rebuilt from the nodes."), 400
+    admission.admit(session_id)
+    with admission.node_io(), voter_filters_lock:
+        voter_filter = rebuild_voter_filter(session_id)
+    return jsonify(voters=voter_filter.count)
+
 @app.route("/vote-question/<session_id>", methods=["GET"])
 def get_vote_question(session_id):
     session = sessions.get(session_id)
     if not session:
         return jsonify(message="Session not found."), 404
-    return jsonify(question=session.get("question", "Secret Voting"))
+    return jsonify(
+        question=session.get("question", "Secret Voting"),
+        ballot_type=session.get("ballot_type", PLURALITY),
+    )
 
 # Return vote options, the list of options and their current vote counts
 @app.route("/vote-options/<session_id>", methods=["GET"])
@@ -100,17 +292,26 @@ def get_vote_options(session_id):
 # Route to retrieve the voting results
 @app.route("/results/<session_id>", methods=["GET"])
 def get_results(session_id):
-    if session_id not in sessions:
+    session = sessions.get(session_id)
+    if not session:
         return jsonify(message="Session not found."), 404
 
+    admission.admit(session_id, READ)
     try:
         # Load slot names
         with open(f"examples/slot_names_{session_id}.txt") as f:
             slot_names = [line.strip() for line in f]
 
-        result_vector = run_get_results(config_path="examples/bvote_config_voting.json")
+        with admission.node_io():
+            result_vector = run_get_results(
+                config_path=session["config_path"],
+                ballot_type=session["ballot_type"],
+                n_slots=session["slots"],
+            )
         results_named = dict(zip(slot_names, result_vector))
         return jsonify(results_named)
+    except Overloaded:
+        raise
     except Exception as e:
         print(f"Error retrieving results from nilDB: {e}")
         return jsonify(message="Failed to retrieve results."), 500
@@ -118,13 +319,21 @@ def get_results(session_id):
 # Get total vote count
 @app.route("/vote-count/<session_id>", methods=["GET"])
 def vote_count(session_id):
-    if session_id not in sessions:
+    session = sessions.get(session_id)
+    if not session:
         return jsonify(message="Session not found."), 404
 
+    admission.admit(session_id, READ)
     try:
-        result_vector = run_get_results(config_path="examples/bvote_config_voting.json")
-        total_votes = sum(result_vector)
+        with admission.node_io():
+            total_votes = run_get_vote_count(
+                config_path=session["config_path"],
+                ballot_type=session["ballot_type"],
+                n_slots=session["slots"],
+            )
         return jsonify(total_votes=total_votes)
+    except Overloaded:
+        raise
     except Exception as e:
         print(f"Error retrieving vote count: {e}")
         return jsonify(message="Failed to retrieve vote count."), 500
@@ -0,0 +1,95 @@
+"""
+Export every node's ballot shares for the configured schema to a snapshot file.
+"""
+
+import argparse
+import asyncio
+import time
+
+from nilrag.ballots import BALLOT_TYPES
+from nilrag.config import ConfigStore, load_nil_db_config_async
+from nilrag.snapshot import write_snapshot
+
+DEFAULT_CONFIG = "examples/nildb_config_voting.json"
+
+def _election_setting(config: dict, config_path: str, key: str, value):
+    """Setting recorded in the config, checked against an explicit value."""
+    recorded = config.get(key)
+    if value is not None and recorded is not None and value != recorded:
+        raise ValueError(
+            f"Error: {key} {value!r} does not match {recorded!r} in {config_path}"
+        )
+    return recorded if value is None else value
+
+async def _export_snapshot_logic(
+    config_path: str,
+    output: str,
+    ballot_type: str | None = None,
+    n_slots: int | None = None,
+    compress: bool = False,
+):
+    """
+    Read all ballot shares from the nodes and write them to `output`.
+
+    The ballot type and number of slots are taken from the election's config
+    (recorded by `init_schema`). Values passed explicitly must match it.
+    """
+    nil_db, _ = await load_nil_db_config_async(
+        config_path,
+        require_bearer_token=True,
+        require_schema_id=True,
+    )
+    config = await ConfigStore(config_path).read_async()
+    ballot_type = _election_setting(config, config_path, "ballot_type", ballot_type)
+    n_slots = _election_setting(config, config_path, "n_slots", n_slots)
+    if ballot_type is None:
+        raise ValueError(
+            f"Error: ballot type not found in {config_path}, pass --ballot_type"
+        )
+
+    print("Retrieving shares from nodes...")
+    start_time = time.time()
+    groups = await nil_db.read_vote_groups()
+    # Ballots are stored group after group, each with its group's node shares
+    votes_by_id = {}
+    for _, group_votes in groups:
+        votes_by_id.update(group_votes)
+    print(f"Found {len(votes_by_id)} unique votes in {time.time() - start_time:.2f} seconds")
+
+    metadata = {
+        "ballot_type": ballot_type,
+        "n_slots": n_slots,
+        "schema_ids": nil_db.nodes[0].schema_ids,
+        "node_urls": [node.url for node in nil_db.nodes],
+        "threshold": nil_db.threshold,
+        "groups": [
+            {"node_indices": node_indices, "ballots": len(group_votes)}
+            for node_indices, group_votes in groups
+        ],
+        "exported_at": int(time.time()),
+    }
+    start_time = time.time()
+    count = write_snapshot(output, votes_by_id, metadata, compress=compress)
+    print(f"Wrote {count} ballots to {output} in {time.time() - start_time:.2f} seconds")
+    return output
+
+# CLI entry point
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export ballot shares to a snapshot file")
+    parser.add_argument("--config", type=str, default=DEFAULT_CONFIG)
+    parser.add_argument("--output", type=str, required=True)
+    parser.add_argument(
+        "--ballot_type", type=str, choices=BALLOT_TYPES, default=None,
+        help="Defaults to the ballot type recorded in the config",
+    )
+    parser.add_argument(
+        "--slots", type=int, default=None,
+        help="Defaults to the number of slots recorded in the config",
+    )
+    parser.add_argument("--compress", action="store_true", help="zlib-compress the snapshot")
+    args = parser.parse_args()
+    asyncio.run(
+        _export_snapshot_logic(
+            args.config, args.output, args.ballot_type, args.slots, args.compress
+        )
+    )
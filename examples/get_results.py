@@ -5,95 +5,124 @@ Retrieve and aggregate voting results from nilDB.
 import argparse
 import asyncio
 import time
-import aiohttp
-from collections import defaultdict
 
-import nilql
-
-from nilrag.config import load_nil_db_config
-from nilrag.util import decrypt_float_list
+from nilrag.ballots import BALLOT_TYPES, PLURALITY, infer_slots, tally
+from nilrag.config import load_nil_db_config_async
+from nilrag.util import decrypt_int_list, generate_sum_key, sum_share_vectors
+from nilrag.validation import find_invalid_ballots, stack_shares
 
 DEFAULT_CONFIG = "examples/nildb_config.json"
 
-def run_get_results(config_path: str = DEFAULT_CONFIG):
+def run_get_results(
+    config_path: str = DEFAULT_CONFIG,
+    ballot_type: str = PLURALITY,
+    n_slots: int | None = None,
+):
     """
     Synchronous wrapper for retrieving and aggregating voting results.
     Can be called from a web backend.
+    Returns the result vector (one value per slot, see `nilrag.ballots.tally`).
     """
-    return asyncio.run(_get_results_logic(config_path))
+    return asyncio.run(_get_results_logic(config_path, ballot_type, n_slots))["results"]
 
-async def _get_results_logic(config_path: str):
+def run_get_vote_count(
+    config_path: str = DEFAULT_CONFIG,
+    ballot_type: str = PLURALITY,
+    n_slots: int | None = None,
+):
+    """
+    Synchronous wrapper returning the number of ballots cast.
+    """
+    return asyncio.run(_get_results_logic(config_path, ballot_type, n_slots))["ballots"]
+
+def _group_totals(key, ballot_type: str, n_slots: int, votes_by_id: dict):
+    """
+    Validate one group of votes read from the same nodes, then sum their
+    shares per node and decrypt the totals (None if no vote is valid).
+    """
+    print(f"Step 2: Validating {len(votes_by_id)} ballots...")
+    vote_ids, share_array = stack_shares(votes_by_id)
+    for vote_id in find_invalid_ballots(key, ballot_type, n_slots, share_array, vote_ids):
+        print(f"Discarding invalid ballot {vote_id}")
+        del votes_by_id[vote_id]
+    if not votes_by_id:
+        return None
+
+    print("Step 3: Aggregating shares and decrypting totals...")
+    # One aggregated share vector per node
+    num_nodes = len(next(iter(votes_by_id.values())))
+    node_totals = [
+        sum_share_vectors([shares[node_idx] for shares in votes_by_id.values()])
+        for node_idx in range(num_nodes)
+    ]
+    return decrypt_int_list(key, list(map(list, zip(*node_totals))))
+
+async def _get_results_logic(
+    config_path: str,
+    ballot_type: str = PLURALITY,
+    n_slots: int | None = None,
+):
     """
     Core async logic for retrieving and aggregating votes.
-    Returns the final result vector (list of vote counts per slot).
+
+    Malformed ballots are detected on their shares and excluded, then the
+    remaining shares are summed per node in the share domain, so only the
+    aggregate vectors (one per group of nodes the votes were read from) are
+    decrypted rather than every individual ballot.
+    Returns the tally summary produced by `nilrag.ballots.tally`.
     """
-    nil_db, _ = load_nil_db_config(
+    nil_db, _ = await load_nil_db_config_async(
         config_path,
         require_bearer_token=True,
         require_schema_id=True,
     )
 
-    num_nodes = len(nil_db.nodes)
-    additive_key = nilql.ClusterKey.generate({"nodes": [{}] * num_nodes}, {"sum": True})
+    sum_key = generate_sum_key(len(nil_db.nodes), nil_db.threshold)
 
     print("Step 1: Retrieving shares from nodes...")
     start_time = time.time()
-    
-    votes_by_id = defaultdict(list)
-    async with aiohttp.ClientSession() as session:
-        for node_idx, node in enumerate(nil_db.nodes):
-            url = f"{node.url}/data/read"
-            headers = {
-                "Authorization": f"Bearer {node.bearer_token}",
-                "Content-Type": "application/json",
-            }
-            payload = {
-                "schema": node.schema_id,
-                "filter": {}  # Get all votes
-            }
-
-            async with session.post(url, headers=headers, json=payload) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    for vote in data.get("data", []):
-                        vote_id = vote.get("_id")
-                        if vote_id:
-                            votes_by_id[vote_id].append((node_idx, vote.get("vote_vector", [])))
-
-    print(f"Found {len(votes_by_id)} unique votes")
-
-    reconstructed_votes = []
-    for vote_id, node_shares in votes_by_id.items():
-        node_shares.sort(key=lambda x: x[0])
-        node_vectors = [share for _, share in node_shares]
-        if not node_vectors:
+
+    # With a threshold, votes are grouped by the t nodes reconstructing them
+    groups = await nil_db.read_vote_groups()
+    print(f"Found {sum(len(votes) for _, votes in groups)} unique votes")
+
+    if n_slots is None:
+        for _, votes_by_id in groups:
+            if votes_by_id:
+                first_shares = next(iter(votes_by_id.values()))
+                n_slots = infer_slots(ballot_type, len(first_shares[0]))
+                break
+
+    totals = None
+    for node_indices, votes_by_id in groups:
+        if not votes_by_id:
             continue
-        vote_shares = list(map(list, zip(*node_vectors)))
-        decrypted_vote = decrypt_float_list(additive_key, vote_shares)
-        decrypted_vote = [int(round(v)) for v in decrypted_vote]
-        reconstructed_votes.append(decrypted_vote)
-        # print(f"Reconstructed vote {vote_id}: {decrypted_vote}")
-
-    if reconstructed_votes:
-        result = [0] * len(reconstructed_votes[0])
-        for vote in reconstructed_votes:
-            for i in range(len(vote)):
-                result[i] += vote[i]
+        group_key = sum_key.for_nodes(node_indices) if nil_db.threshold else sum_key
+        group_totals = _group_totals(group_key, ballot_type, n_slots, votes_by_id)
+        if group_totals is not None:
+            totals = group_totals if totals is None else [
+                a + b for a, b in zip(totals, group_totals)
+            ]
+
+    if totals is None:
+        summary = {"results": [0] * (n_slots or 0), "ballots": 0}
     else:
-        result = []
+        summary = tally(ballot_type, totals, n_slots)
 
     end_time = time.time()
     print(f"\nResults computed in {end_time - start_time:.2f} seconds")
 
-    print("\nFinal Results:")
-    for i, count in enumerate(result):
-        print(f"Slot {i}: {count} votes")
+    print(f"\nFinal Results ({summary['ballots']} ballots):")
+    for i, count in enumerate(summary["results"]):
+        print(f"Slot {i}: {count}")
 
-    return result
+    return summary
 
 # CLI Entry point
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Retrieve voting results from nilDB")
     parser.add_argument("--config", type=str, default=DEFAULT_CONFIG)
+    parser.add_argument("--ballot_type", type=str, choices=BALLOT_TYPES, default=PLURALITY)
+    parser.add_argument("--slots", type=int, default=None)
     args = parser.parse_args()
-    asyncio.run(_get_results_logic(args.config))
+    asyncio.run(_get_results_logic(args.config, args.ballot_type, args.slots))
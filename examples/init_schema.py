@@ -3,51 +3,98 @@ Initialize a voting schema in NilDB and store configuration with JWTs.
 """
 
 import asyncio
-import json
 import time
 import argparse
 
-from nilrag.config import load_nil_db_config
+from nilrag.ballots import BALLOT_TYPES, PLURALITY
+from nilrag.config import ConfigStore, load_nil_db_config_async
+from nilrag.nildb_requests import NilDB
 
 # Default configuration file for the voting system
 DEFAULT_CONFIG = "examples/nildb_config_voting.json"
 DEFAULT_NUMBER_SLOTS = 5
 
-def run_init_schema(config_path=DEFAULT_CONFIG, slots=DEFAULT_NUMBER_SLOTS):
+def run_init_schema(
+    config_path=DEFAULT_CONFIG,
+    slots=DEFAULT_NUMBER_SLOTS,
+    ballot_type=PLURALITY,
+    shards=1,
+    threshold=None,
+    election_config_path=None,
+):
     """
     Synchronous wrapper to call from web API.
     """
-    return asyncio.run(_init_schema_logic(config_path, slots))
+    return asyncio.run(
+        _init_schema_logic(
+            config_path, slots, ballot_type, shards, threshold, election_config_path
+        )
+    )
 
-async def _init_schema_logic(config_path, slots):
+async def _init_schema_logic(
+    config_path,
+    slots,
+    ballot_type=PLURALITY,
+    shards=1,
+    threshold=None,
+    election_config_path=None,
+):
     """
     Core logic for initializing the schema.
+
+    With a `threshold`, votes are Shamir-shared so that any `threshold` nodes
+    can reconstruct them; the threshold is stored in the config file.
+
+    The election's schema IDs, tokens and threshold are written to
+    `election_config_path` when given, leaving `config_path` untouched, so
+    that concurrent elections each keep their own configuration. Otherwise
+    `config_path` is updated in place.
     """
     # Load NilDB configuration (this time using the voting-specific config)
-    nil_db, secret_key = load_nil_db_config(config_path, require_secret_key=True)
-    
+    nil_db, secret_key = await load_nil_db_config_async(
+        config_path, require_secret_key=True
+    )
+
+    # The threshold belongs to the new election, not to the previous config
+    nil_db = NilDB(nil_db.nodes, threshold=threshold)
+
     # Generate JWT tokens for each node
     jwts = nil_db.generate_jwt(secret_key, ttl=3600)
 
     print(nil_db)
     print("Initializing schema...")
     start_time = time.time()
-    schema_id = await nil_db.init_schema(n_slots=slots)
+    schema_id = await nil_db.init_schema(
+        n_slots=slots, ballot_type=ballot_type, n_shards=shards
+    )
     end_time = time.time()
     print(f"Schema initialized successfully in {end_time - start_time:.2f} seconds")
 
-    # Update config file with schema ID and bearer tokens for each node
-    with open(config_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    # Update the nodes with the schema_id and bearer tokens (JWT)
-    for node_data, jwt in zip(data["nodes"], jwts):
-        node_data["schema_id"] = schema_id
-        node_data["bearer_token"] = jwt
+    # Update the nodes with the schema_id, shard schema IDs and bearer tokens (JWT)
+    def set_schema(data):
+        # Recorded so that tools reading the config (e.g. the snapshot
+        # exporter) know how to interpret the ballots
+        data["ballot_type"] = ballot_type
+        data["n_slots"] = slots
+        if threshold is not None:
+            data["threshold"] = threshold
+        else:
+            data.pop("threshold", None)
+        for node_data, node, jwt in zip(data["nodes"], nil_db.nodes, jwts):
+            node_data["schema_id"] = schema_id
+            node_data["bearer_token"] = jwt
+            if node.shard_schema_ids:
+                node_data["shard_schema_ids"] = node.shard_schema_ids
+            else:
+                node_data.pop("shard_schema_ids", None)
 
-    # Save the updated config file
-    with open(config_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+    if election_config_path is None or election_config_path == config_path:
+        # Atomically rewrite the config file in place
+        await ConfigStore(config_path).update_async(set_schema)
+    else:
+        data = await ConfigStore(config_path).read_async()
+        set_schema(data)
+        await ConfigStore(election_config_path).write_async(data)
 
     print("Updated NilDB configuration file with schema ID and JWT tokens.")
    # return f"Schema initialized in {end_time - start_time:.2f}s with schema_id: {schema_id}"
@@ -69,5 +116,35 @@ if __name__ == "__main__":
         default=DEFAULT_NUMBER_SLOTS,
         help=f"Number of vote slots (default: {DEFAULT_NUMBER_SLOTS})",
     )
+    parser.add_argument(
+        "--ballot_type",
+        type=str,
+        choices=BALLOT_TYPES,
+        default=PLURALITY,
+        help=f"Ballot type (default: {PLURALITY})",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Number of schemas to spread the ballots over on each node (default: 1)",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=int,
+        default=None,
+        help="Nodes needed to reconstruct a vote (default: all nodes, additive sharing)",
+    )
+    parser.add_argument(
+        "--election_config",
+        type=str,
+        default=None,
+        help="Write the election's configuration here instead of updating --config",
+    )
     args = parser.parse_args()
-    asyncio.run(_init_schema_logic(args.config, args.slots))
+    asyncio.run(
+        _init_schema_logic(
+            args.config, args.slots, args.ballot_type, args.shards, args.threshold,
+            args.election_config,
+        )
+    )
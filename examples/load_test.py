@@ -0,0 +1,205 @@
+"""
+Load-generate against the voting backend.
+
+Creates an election through `/init`, then simulates voters arriving as an
+open-loop Poisson process at a fixed rate, each submitting one ballot to
+`/vote/<session_id>`, while `/vote-count` and `/results` are polled in the
+background. Once all voters have been sent, voting is closed and the final
+`/results` are fetched. Reports
+sustained throughput, latency percentiles and an error breakdown per
+endpoint.
+
+Run the backend against local mock nodes first, e.g.:
+    uv run examples/mock_nildb.py
+    uv run backend/app.py
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict
+from uuid import uuid4
+
+import aiohttp
+
+from nilrag.ballots import APPROVAL, BALLOT_TYPES, PLURALITY, SCORE
+
+DEFAULT_URL = "http://127.0.0.1:5000"
+
+class Stats:
+    """Latencies and outcomes of the requests made to each endpoint."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+
+    def record(self, endpoint: str, latency: float, outcome: str):
+        """Record one request; `outcome` is "ok" or an error label."""
+        self.outcomes[endpoint][outcome] += 1
+        if outcome == "ok":
+            self.latencies[endpoint].append(latency)
+
+    def report(self, elapsed: float):
+        """Print throughput, latency percentiles and errors per endpoint."""
+        print(f"\nDuration: {elapsed:.2f} seconds")
+        for endpoint in sorted(self.outcomes):
+            outcomes = self.outcomes[endpoint]
+            total = sum(outcomes.values())
+            ok = outcomes["ok"]
+            print(f"\n{endpoint}: {total} requests, {ok} ok, {ok / elapsed:.1f} ok/s")
+            latencies = sorted(self.latencies[endpoint])
+            if latencies:
+                print(
+                    "  latency ms: "
+                    + ", ".join(
+                        f"p{p}={_percentile(latencies, p) * 1000:.1f}"
+                        for p in (50, 90, 99)
+                    )
+                    + f", max={latencies[-1] * 1000:.1f}"
+                )
+            errors = {k: v for k, v in outcomes.items() if k != "ok"}
+            if errors:
+                print("  errors: " + ", ".join(f"{k}={v}" for k, v in sorted(errors.items())))
+
+def _percentile(sorted_values: list[float], p: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def random_choice(ballot_type: str, n_slots: int) -> str:
+    """Random valid choice string for a ballot type."""
+    if ballot_type == PLURALITY:
+        choice = [0] * n_slots
+        choice[random.randrange(n_slots)] = 1
+    elif ballot_type == APPROVAL:
+        choice = [random.randint(0, 1) for _ in range(n_slots)]
+        choice[random.randrange(n_slots)] = 1
+    elif ballot_type == SCORE:
+        choice = [random.randint(0, 5) for _ in range(n_slots)]
+    else:
+        choice = random.sample(range(1, n_slots + 1), n_slots)
+    return ",".join(str(x) for x in choice)
+
+async def _request(session, stats, endpoint, method, url, **kwargs):
+    """Make one request, record its outcome and return the JSON body (or None)."""
+    start = time.perf_counter()
+    try:
+        async with session.request(method, url, **kwargs) as response:
+            if response.status != 200:
+                # Error pages (e.g. an HTML 500) are not parsed
+                stats.record(endpoint, time.perf_counter() - start, f"http_{response.status}")
+                return None
+            body = await response.json(content_type=None)
+            latency = time.perf_counter() - start
+            # The backend reports known vote errors with a 200 and a message
+            if not isinstance(body, dict):
+                outcome = "bad_body"
+            elif endpoint == "vote" and "successfully" not in str(body.get("message", "")):
+                outcome = "rejected"
+            else:
+                outcome = "ok"
+            stats.record(endpoint, latency, outcome)
+            return body if outcome == "ok" else None
+    except ValueError:
+        # Not JSON (json.JSONDecodeError is a ValueError)
+        stats.record(endpoint, time.perf_counter() - start, "bad_body")
+        return None
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        stats.record(endpoint, time.perf_counter() - start, type(e).__name__)
+        return None
+
+async def run_load_test(
+    base_url: str = DEFAULT_URL,
+    voters: int = 100,
+    rate: float = 10.0,
+    slots: int = 3,
+    ballot_type: str = PLURALITY,
+    poll_interval: float = 1.0,
+    timeout: float = 30.0,
+):
+    """
+    Create an election and drive `voters` votes at `rate` arrivals per second.
+    """
+    stats = Stats()
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(timeout=client_timeout, connector=connector) as session:
+        init = await _request(
+            session, stats, "init", "POST", f"{base_url}/init",
+            json={
+                "question": "Load test",
+                "slots": slots,
+                "slot_names": [f"Option {i + 1}" for i in range(slots)],
+                "ballot_type": ballot_type,
+            },
+        )
+        if not init:
+            stats.report(1.0)
+            raise RuntimeError("Failed to create the election")
+        session_id = init["session_id"]
+        print(f"Created session {session_id}, sending {voters} voters at {rate}/s")
+
+        done = asyncio.Event()
+
+        async def poll(endpoint: str, path: str):
+            while not done.is_set():
+                await _request(session, stats, endpoint, "GET", f"{base_url}/{path}/{session_id}")
+                try:
+                    await asyncio.wait_for(done.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+        pollers = [
+            asyncio.create_task(poll("vote-count", "vote-count")),
+            asyncio.create_task(poll("results", "results")),
+        ]
+
+        # Open-loop arrivals: voters are sent on schedule regardless of how
+        # quickly earlier requests complete
+        start_time = time.perf_counter()
+        in_flight = []
+        for _ in range(voters):
+            in_flight.append(
+                asyncio.create_task(
+                    _request(
+                        session, stats, "vote", "POST", f"{base_url}/vote/{session_id}",
+                        json={
+                            "voter_id": str(uuid4()),
+                            "choice": random_choice(ballot_type, slots),
+                        },
+                    )
+                )
+            )
+            await asyncio.sleep(random.expovariate(rate))
+        await asyncio.gather(*in_flight)
+        vote_elapsed = time.perf_counter() - start_time
+
+        await _request(session, stats, "vote-finish", "POST", f"{base_url}/vote-finish/{session_id}")
+        done.set()
+        await asyncio.gather(*pollers)
+
+        results = await _request(session, stats, "results", "GET", f"{base_url}/results/{session_id}")
+        elapsed = time.perf_counter() - start_time
+
+    print(f"\nSustained vote throughput: {stats.outcomes['vote']['ok'] / vote_elapsed:.1f} votes/s")
+    stats.report(elapsed)
+    print(f"\nFinal results: {results}")
+    return stats
+
+# CLI entry point
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the voting backend")
+    parser.add_argument("--url", type=str, default=DEFAULT_URL)
+    parser.add_argument("--voters", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=10.0, help="Voter arrivals per second")
+    parser.add_argument("--slots", type=int, default=3)
+    parser.add_argument("--ballot_type", type=str, choices=BALLOT_TYPES, default=PLURALITY)
+    parser.add_argument("--poll_interval", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout")
+    args = parser.parse_args()
+    asyncio.run(
+        run_load_test(
+            args.url, args.voters, args.rate, args.slots,
+            args.ballot_type, args.poll_interval, args.timeout,
+        )
+    )
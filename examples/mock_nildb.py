@@ -0,0 +1,139 @@
+"""
+Run local in-memory nilDB mock nodes for development and load testing.
+
+Each node implements the subset of the nilDB API the voting app uses
+(`/schemas`, `/data/create`, `/data/read`) and keeps everything in memory.
+A matching configuration file is written so the backend can be pointed at
+the mock nodes.
+"""
+
+import argparse
+import asyncio
+import os
+from collections import defaultdict
+
+from aiohttp import web
+from ecdsa import SECP256k1, SigningKey
+
+from nilrag.config import ConfigStore
+
+DEFAULT_CONFIG = "examples/bvote_config_voting.json"
+DEFAULT_PORT = 8081
+DEFAULT_NODES = 3
+
+def create_node_app(latency: float = 0.0) -> web.Application:
+    """
+    Create one mock node.
+
+    Args:
+        latency (float): Artificial delay in seconds added to every request
+    """
+    schemas = set()
+    records = defaultdict(list)
+
+    async def delay():
+        if latency:
+            await asyncio.sleep(latency)
+
+    async def create_schema(request):
+        payload = await request.json()
+        await delay()
+        schemas.add(payload["_id"])
+        return web.json_response({"data": payload["_id"]}, status=201)
+
+    async def create_data(request):
+        payload = await request.json()
+        await delay()
+        if payload.get("schema") not in schemas:
+            return web.json_response({"errors": ["schema not found"]}, status=404)
+        records[payload["schema"]].extend(payload.get("data", []))
+        created = [entry.get("_id") for entry in payload.get("data", [])]
+        return web.json_response({"data": {"created": created, "errors": []}})
+
+    async def read_data(request):
+        payload = await request.json()
+        await delay()
+        if payload.get("schema") not in schemas:
+            return web.json_response({"errors": ["schema not found"]}, status=404)
+        data_filter = payload.get("filter", {})
+        limit = payload.get("options", {}).get("limit")
+        matches = [
+            entry
+            for entry in records[payload["schema"]]
+            if all(entry.get(k) == v for k, v in data_filter.items())
+        ]
+        if limit is not None:
+            matches = matches[:limit]
+        return web.json_response({"data": matches})
+
+    app = web.Application()
+    app.router.add_post("/schemas", create_schema)
+    app.router.add_post("/data/create", create_data)
+    app.router.add_post("/data/read", read_data)
+    return app
+
+def write_mock_config(config_path: str, urls: list[str], force: bool = False) -> None:
+    """
+    Write a configuration file pointing at the mock nodes.
+
+    Raises:
+        FileExistsError: If the file exists and `force` is not set
+    """
+    if os.path.exists(config_path) and not force:
+        raise FileExistsError(
+            f"Error: {config_path} already exists, pass --force to overwrite it"
+        )
+    secret_key = SigningKey.generate(curve=SECP256k1).to_string().hex()
+    ConfigStore(config_path).write(
+        {
+            "org_secret_key": secret_key,
+            "org_did": "did:nil:testnet:mock-org",
+            "nodes": [
+                {"url": url, "node_id": f"did:nil:testnet:mock-node-{i}"}
+                for i, url in enumerate(urls)
+            ],
+        }
+    )
+
+async def run_mock_nodes(
+    n_nodes: int = DEFAULT_NODES,
+    port: int = DEFAULT_PORT,
+    latency: float = 0.0,
+    config_path: str | None = DEFAULT_CONFIG,
+    force: bool = False,
+):
+    """
+    Start `n_nodes` mock nodes on consecutive ports and serve until cancelled.
+    """
+    urls = [f"http://127.0.0.1:{port + i}" for i in range(n_nodes)]
+    if config_path:
+        write_mock_config(config_path, urls, force)
+        print(f"Wrote mock node configuration to {config_path}")
+
+    runners = []
+    for i in range(n_nodes):
+        runner = web.AppRunner(create_node_app(latency), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port + i).start()
+        runners.append(runner)
+        print(f"Mock node {i} listening on {urls[i]}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+# CLI entry point
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run local in-memory nilDB mock nodes")
+    parser.add_argument("--nodes", type=int, default=DEFAULT_NODES)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port of the first node")
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay per request in seconds")
+    parser.add_argument("--config", type=str, default=DEFAULT_CONFIG)
+    parser.add_argument("--force", action="store_true", help="Overwrite an existing config file")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_mock_nodes(args.nodes, args.port, args.latency, args.config, args.force))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,84 @@
+"""
+Recount an election offline from a snapshot file, without contacting any node.
+"""
+
+import argparse
+import time
+
+from nilrag.ballots import BALLOT_TYPES, infer_slots, tally
+from nilrag.snapshot import read_snapshot
+from nilrag.util import decrypt_int_list, generate_sum_key
+from nilrag.validation import find_invalid_ballots
+
+
+def run_recount(
+    snapshot_path: str,
+    ballot_type: str | None = None,
+    n_slots: int | None = None,
+    validate: bool = True,
+):
+    """
+    Tally the ballots stored in a snapshot.
+
+    The ballot type and number of slots default to the snapshot metadata.
+    Returns the tally summary produced by `nilrag.ballots.tally`.
+    """
+    start_time = time.time()
+    snapshot = read_snapshot(snapshot_path)
+    n_nodes, n_ballots, vector_len = snapshot.shares.shape
+    ballot_type = ballot_type or snapshot.metadata.get("ballot_type")
+    if ballot_type is None:
+        raise ValueError("Error: ballot type not found in snapshot, pass --ballot_type")
+    n_slots = n_slots or snapshot.metadata.get("n_slots")
+    if n_slots is None:
+        n_slots = infer_slots(ballot_type, vector_len)
+    print(f"Loaded {n_ballots} ballots from {n_nodes} nodes ({ballot_type}, {n_slots} slots)")
+
+    if n_ballots == 0:
+        return {"results": [0] * n_slots, "ballots": 0}
+
+    # Threshold snapshots hold, for each group of ballots, the shares of the
+    # nodes those ballots were read from
+    threshold = snapshot.metadata.get("threshold")
+    if threshold:
+        sum_key = generate_sum_key(len(snapshot.metadata["node_urls"]), threshold)
+    else:
+        sum_key = generate_sum_key(n_nodes)
+
+    vote_ids = snapshot.vote_ids if validate else []
+    totals = [0] * vector_len
+    for node_indices, start, end in snapshot.groups():
+        group_key = sum_key.for_nodes(node_indices) if threshold else sum_key
+        invalid = []
+        if validate and end > start:
+            invalid = find_invalid_ballots(
+                group_key, ballot_type, n_slots,
+                snapshot.shares[:, start:end], vote_ids[start:end],
+            )
+            for vote_id in invalid:
+                print(f"Discarding invalid ballot {vote_id}")
+
+        node_totals = snapshot.node_totals(exclude=invalid, ballots=slice(start, end))
+        group_totals = decrypt_int_list(group_key, list(map(list, zip(*node_totals))))
+        totals = [a + b for a, b in zip(totals, group_totals)]
+    summary = tally(ballot_type, totals, n_slots)
+
+    print(f"\nRecount completed in {time.time() - start_time:.2f} seconds")
+    print(f"\nFinal Results ({summary['ballots']} ballots):")
+    for i, count in enumerate(summary["results"]):
+        print(f"Slot {i}: {count}")
+    return summary
+
+# CLI entry point
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recount an election from a snapshot file")
+    parser.add_argument("snapshot", type=str)
+    parser.add_argument("--ballot_type", type=str, choices=BALLOT_TYPES, default=None)
+    parser.add_argument("--slots", type=int, default=None)
+    parser.add_argument(
+        "--skip_validation",
+        action="store_true",
+        help="Do not check ballot well-formedness before tallying",
+    )
+    args = parser.parse_args()
+    run_recount(args.snapshot, args.ballot_type, args.slots, not args.skip_validation)
@@ -1,24 +1,72 @@
 import argparse
 import asyncio
 import time
-import nilql
-from nilrag.config import load_nil_db_config
-from nilrag.util import decrypt_float_list, encrypt_float_list
+from nilrag.ballots import BALLOT_TYPES, PLURALITY, encode_ballot, parse_choice
+from nilrag.config import load_nil_db_config_async
+from nilrag.util import encrypt_int_list, generate_sum_key
 
 DEFAULT_CONFIG = "examples/nildb_config_voting.json"
 
-def run_upload_vote(voter_id: str, vote: str, config_path: str = DEFAULT_CONFIG):
+def run_upload_vote(
+    voter_id: str,
+    vote: str,
+    config_path: str = DEFAULT_CONFIG,
+    ballot_type: str = PLURALITY,
+    check_duplicate: bool = True,
+    **ballot_options,
+):
     """
     Synchronous entry point to upload a vote.
+
+    `ballot_options` (max_choices, max_score) are passed to `encode_ballot`.
+    """
+    return asyncio.run(
+        _upload_vote_logic(
+            voter_id, vote, config_path, ballot_type, check_duplicate, **ballot_options
+        )
+    )
+
+def run_has_voted(voter_id: str, config_path: str = DEFAULT_CONFIG) -> bool:
+    """
+    Synchronous entry point to check whether a voter has already voted.
     """
-    return asyncio.run(_upload_vote_logic(voter_id, vote, config_path))
+    return asyncio.run(_has_voted_logic(voter_id, config_path))
 
-async def _upload_vote_logic(voter_id: str, vote_str: str, config_path: str):
+def run_read_voter_ids(config_path: str = DEFAULT_CONFIG) -> list[str]:
+    """
+    Synchronous entry point listing the voters who have already voted.
+    """
+    return asyncio.run(_read_voter_ids_logic(config_path))
+
+async def _has_voted_logic(voter_id: str, config_path: str) -> bool:
+    nil_db, _ = await load_nil_db_config_async(
+        config_path,
+        require_bearer_token=True,
+        require_schema_id=True,
+    )
+    return await nil_db.has_voted(voter_id)
+
+async def _read_voter_ids_logic(config_path: str) -> list[str]:
+    nil_db, _ = await load_nil_db_config_async(
+        config_path,
+        require_bearer_token=True,
+        require_schema_id=True,
+    )
+    return await nil_db.read_voter_ids()
+
+async def _upload_vote_logic(
+    voter_id: str,
+    vote_str: str,
+    config_path: str,
+    ballot_type: str = PLURALITY,
+    check_duplicate: bool = True,
+    **ballot_options,
+):
     """
     Async function to upload a vote.
     """
     # Load NilDB configuration
-    nil_db, _ = load_nil_db_config(
+    nil_db, _ = await load_nil_db_config_async(
         config_path,
         require_bearer_token=True,
         require_schema_id=True,
@@ -28,25 +76,21 @@ async def _upload_vote_logic(voter_id: str, vote_str: str, config_path: str):
 
     # Initialize secret keys for different modes of operation
     num_nodes = len(nil_db.nodes)
-    additive_key = nilql.ClusterKey.generate({"nodes": [{}] * num_nodes}, {"sum": True})
+    sum_key = generate_sum_key(num_nodes, nil_db.threshold)
 
-    # Process the vote string into a list of floats
-    vote = [float(x) for x in vote_str.split(',')]
-    if not all(x in (0.0, 1.0) for x in vote):
-        raise ValueError("Vote must only contain 0s and a single 1.")
-    if vote.count(1.0) != 1:
-        raise ValueError("Vote must contain exactly one '1' and the rest '0's.")
+    # Validate the vote string and encode it as an additive ballot
+    vote = encode_ballot(ballot_type, parse_choice(vote_str), **ballot_options)
 
-    print(f"Original vote: {vote}")
+    print(f"Original vote: {vote_str} ({ballot_type}), encoded as {vote}")
 
     # Encrypt vote
     print("Encrypting vote...")
     start_time = time.time()
-    vote_shares = encrypt_float_list(additive_key, vote)
+    vote_shares = encrypt_int_list(sum_key, vote)
     end_time = time.time()
     print(f"Vote encrypted in {end_time - start_time:.2f} seconds")
 
-    # actual_vote = decrypt_float_list(additive_key, vote_shares)
+    # actual_vote = decrypt_int_list(sum_key, vote_shares)
     # print(f"Actual vote: {actual_vote}")
 
     # Debug: Upload preview
@@ -57,7 +101,7 @@ async def _upload_vote_logic(voter_id: str, vote_str: str, config_path: str):
 
     print("\nUploading vote...")
     start_time = time.time()
-    await nil_db.upload_vote(vote_shares, voter_id)
+    await nil_db.upload_vote(vote_shares, voter_id, check_duplicate=check_duplicate)
     end_time = time.time()
     print(f"Vote uploaded in {end_time - start_time:.2f} seconds")
 
@@ -69,6 +113,18 @@ if __name__ == "__main__":
     parser.add_argument("--config", type=str, default=DEFAULT_CONFIG)
     parser.add_argument("--voter_id", type=str, required=True)
     parser.add_argument("--vote", type=str, default="1,0,0")
+    parser.add_argument("--ballot_type", type=str, choices=BALLOT_TYPES, default=PLURALITY)
+    parser.add_argument("--max_choices", type=int, default=None)
+    parser.add_argument("--max_score", type=int, default=None)
     args = parser.parse_args()
 
-    asyncio.run(_upload_vote_logic(args.voter_id, args.vote, args.config))
+    asyncio.run(
+        _upload_vote_logic(
+            args.voter_id,
+            args.vote,
+            args.config,
+            args.ballot_type,
+            max_choices=args.max_choices,
+            max_score=args.max_score,
+        )
+    )
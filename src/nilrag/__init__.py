@@ -3,7 +3,8 @@ nilRAG init file.
 """
 
 from .nildb_requests import NilDB, Node  # noqa: F401
-from .util import (decrypt_float_list , encrypt_float_list,
-                   from_fixed_point, to_fixed_point)
+from .util import (ThresholdKey, decrypt_float_list , decrypt_int_list,
+                   encrypt_float_list, encrypt_int_list, from_fixed_point,
+                   generate_sum_key, sum_share_vectors, to_fixed_point)
 
 __version__ = "0.1.0"
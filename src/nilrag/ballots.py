@@ -0,0 +1,215 @@
+"""
+Ballot encodings for the supported voting methods.
+
+Every ballot is encoded as a vector of small non-negative integers whose
+element-wise sum over all ballots carries the election result, so votes can
+be aggregated additively on the secret shares and only the totals need to be
+decrypted. The last entry of every encoded ballot is a constant 1 which,
+once summed, gives the number of ballots cast.
+"""
+
+from typing import Optional
+
+PLURALITY = "plurality"
+APPROVAL = "approval"
+SCORE = "score"
+RANKED = "ranked"
+
+BALLOT_TYPES = (PLURALITY, APPROVAL, SCORE, RANKED)
+
+DEFAULT_MAX_SCORE = 5
+
+
+def vector_length(ballot_type: str, n_slots: int) -> int:
+    """
+    Length of an encoded ballot.
+
+    Args:
+        ballot_type (str): One of BALLOT_TYPES
+        n_slots (int): Number of options in the election
+
+    Returns:
+        int: Number of integers stored per ballot, including the ballot counter
+    """
+    check_ballot_type(ballot_type)
+    if ballot_type == RANKED:
+        # Position-count matrix: one row per option, one column per rank
+        return n_slots * n_slots + 1
+    return n_slots + 1
+
+
+def infer_slots(ballot_type: str, vector_len: int) -> int:
+    """
+    Number of options of an election, recovered from its encoded ballot length.
+
+    Inverse of `vector_length`.
+    """
+    check_ballot_type(ballot_type)
+    if ballot_type == RANKED:
+        return int(round((vector_len - 1) ** 0.5))
+    return vector_len - 1
+
+
+def check_ballot_type(ballot_type: str) -> None:
+    """
+    Raises:
+        ValueError: If the ballot type is not supported
+    """
+    if ballot_type not in BALLOT_TYPES:
+        raise ValueError(
+            f"Unknown ballot type '{ballot_type}', expected one of {BALLOT_TYPES}"
+        )
+
+
+def parse_choice(choice: str) -> list[int]:
+    """
+    Parse a comma-separated choice string such as "1,0,0" into integers.
+
+    Raises:
+        ValueError: If an entry is not an integer
+    """
+    try:
+        return [int(x.strip()) for x in choice.split(",")]
+    except ValueError as exc:
+        raise ValueError(f"Invalid vote '{choice}': entries must be integers.") from exc
+
+
+def encode_ballot(
+    ballot_type: str,
+    choice: list[int],
+    n_slots: Optional[int] = None,
+    max_choices: Optional[int] = None,
+    max_score: Optional[int] = None,
+) -> list[int]:
+    """
+    Validate a voter's choice and encode it as an additive ballot vector.
+
+    The choice always has one entry per option:
+        - plurality: exactly one 1, the rest 0
+        - approval: 0/1 per option, between 1 and `max_choices` 1s
+        - score: an integer between 0 and `max_score` per option
+        - ranked: the rank of each option (1 = first choice); every option
+          must be ranked exactly once
+
+    Args:
+        ballot_type (str): One of BALLOT_TYPES
+        choice (list): Voter's choice, one entry per option
+        n_slots (int, optional): Expected number of options
+        max_choices (int, optional): Approval limit (defaults to all options)
+        max_score (int, optional): Highest score (defaults to DEFAULT_MAX_SCORE)
+
+    Returns:
+        list: Encoded ballot of length `vector_length(ballot_type, n_slots)`
+
+    Raises:
+        ValueError: If the choice is not a valid ballot of this type
+    """
+    check_ballot_type(ballot_type)
+    n = len(choice)
+    if n_slots is not None and n != n_slots:
+        raise ValueError(f"Vote must have {n_slots} entries, got {n}.")
+
+    if ballot_type == PLURALITY:
+        if not all(x in (0, 1) for x in choice):
+            raise ValueError("Vote must only contain 0s and a single 1.")
+        if choice.count(1) != 1:
+            raise ValueError("Vote must contain exactly one '1' and the rest '0's.")
+        counts = list(choice)
+
+    elif ballot_type == APPROVAL:
+        limit = n if max_choices is None else max_choices
+        if not all(x in (0, 1) for x in choice):
+            raise ValueError("Approval vote must only contain 0s and 1s.")
+        if not 1 <= choice.count(1) <= limit:
+            raise ValueError(f"Approval vote must approve between 1 and {limit} options.")
+        counts = list(choice)
+
+    elif ballot_type == SCORE:
+        top = DEFAULT_MAX_SCORE if max_score is None else max_score
+        if not all(0 <= x <= top for x in choice):
+            raise ValueError(f"Scores must be between 0 and {top}.")
+        counts = list(choice)
+
+    else:
+        if sorted(choice) != list(range(1, n + 1)):
+            raise ValueError(f"Ranked vote must rank every option from 1 to {n} once.")
+        counts = [0] * (n * n)
+        for option, rank in enumerate(choice):
+            counts[option * n + rank - 1] = 1
+
+    return counts + [1]
+
+
+def tally(ballot_type: str, totals: list[int], n_slots: int) -> dict:
+    """
+    Turn the decrypted sum of all encoded ballots into election results.
+
+    Plurality and approval results are vote counts, score results are total
+    scores, and ranked results are Borda scores (n - 1 points for a first
+    choice down to 0 for a last choice) alongside the position counts.
+
+    Args:
+        ballot_type (str): One of BALLOT_TYPES
+        totals (list): Element-wise sum of all encoded ballots
+        n_slots (int): Number of options in the election
+
+    Returns:
+        dict: "results" (one value per option), "ballots" (number of ballots)
+        and, for ranked ballots, "position_counts" (option x rank matrix)
+    """
+    if len(totals) != vector_length(ballot_type, n_slots):
+        raise ValueError(
+            f"Expected {vector_length(ballot_type, n_slots)} totals, got {len(totals)}"
+        )
+    summary = {"ballots": totals[-1]}
+    if ballot_type == RANKED:
+        matrix = [totals[i * n_slots:(i + 1) * n_slots] for i in range(n_slots)]
+        summary["results"] = [
+            sum(count * (n_slots - 1 - pos) for pos, count in enumerate(row))
+            for row in matrix
+        ]
+        summary["position_counts"] = matrix
+    else:
+        summary["results"] = list(totals[:-1])
+    return summary
+
+
+def validity_constraints(ballot_type: str, n_slots: int) -> list[list[int]]:
+    """
+    Linear equations every well-formed encoded ballot satisfies.
+
+    Each returned row `a` must satisfy `sum(a[i] * ballot[i]) == 0`. Rows are
+    homogeneous (constants are expressed through the ballot counter entry), so
+    they can be evaluated directly on secret shares. Together with the check
+    that the counter entry equals 1, they reject ballots such as [5, 0, 0] for
+    plurality or a ranked matrix that is not a permutation. Range conditions
+    (entries being 0/1 or within the score limit) are not linear and are only
+    enforced by `encode_ballot` on the client.
+
+    Args:
+        ballot_type (str): One of BALLOT_TYPES
+        n_slots (int): Number of options in the election
+
+    Returns:
+        list: Coefficient rows of length `vector_length(ballot_type, n_slots)`
+    """
+    length = vector_length(ballot_type, n_slots)
+    rows = []
+    if ballot_type == PLURALITY:
+        # Exactly one vote per ballot
+        rows.append([1] * n_slots + [-1])
+    elif ballot_type == RANKED:
+        # Every option holds exactly one rank and every rank exactly one option
+        for option in range(n_slots):
+            row = [0] * length
+            for pos in range(n_slots):
+                row[option * n_slots + pos] = 1
+            row[-1] = -1
+            rows.append(row)
+        for pos in range(n_slots):
+            row = [0] * length
+            for option in range(n_slots):
+                row[option * n_slots + pos] = 1
+            row[-1] = -1
+            rows.append(row)
+    return rows
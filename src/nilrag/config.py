@@ -2,9 +2,13 @@
 Configuration loading utilities for nilRAG.
 """
 
+import asyncio
 import json
 import os
-from typing import Optional, Tuple
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
 
 from nilrag.nildb_requests import NilDB, Node
 
@@ -39,13 +43,7 @@ def load_nil_db_config(
         )
 
     print(f"Loading NilDB configuration from {config_path}...")
-    try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as exc:
-        raise ValueError(
-            f"Error: Invalid JSON in configuration file {config_path}"
-        ) from exc
+    data = ConfigStore(config_path).read()
 
     # Get secret key if required
     secret_key = None
@@ -70,7 +68,157 @@ def load_nil_db_config(
             org=data.get("org_did"),
             bearer_token=node_data.get("bearer_token"),
             schema_id=node_data.get("schema_id"),
+            shard_schema_ids=node_data.get("shard_schema_ids"),
         )
         nodes.append(node)
 
-    return NilDB(nodes), secret_key
+    return NilDB(nodes, threshold=data.get("threshold")), secret_key
+
+
+async def load_nil_db_config_async(
+    config_path: str,
+    require_secret_key: bool = False,
+    require_bearer_token: bool = False,
+    require_schema_id: bool = False,
+) -> Tuple[NilDB, Optional[str]]:
+    """
+    Load nilDB configuration without blocking the running event loop.
+
+    The file read and JSON parsing run in a worker thread; see
+    `load_nil_db_config` for arguments, return value and errors.
+    """
+    return await asyncio.to_thread(
+        load_nil_db_config,
+        config_path,
+        require_secret_key,
+        require_bearer_token,
+        require_schema_id,
+    )
+
+
+class ConfigStore:
+    """
+    Shared JSON configuration file with atomic, serialized writes.
+
+    Writes go to a temporary file in the same directory which is then renamed
+    over the original, so readers always see either the old or the new
+    content, never a partially written file. Writers of the same path are
+    serialized with a process-wide lock, so read-modify-write updates from
+    concurrent requests do not overwrite each other.
+
+    Attributes:
+        path (str): Path to the JSON configuration file
+    """
+
+    _locks: Dict[str, threading.Lock] = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, path: str):
+        """
+        Initialize a store for the configuration file at `path`.
+
+        Args:
+            path (str): Path to the JSON configuration file
+        """
+        self.path = path
+        key = os.path.abspath(path)
+        with ConfigStore._locks_guard:
+            self._lock = ConfigStore._locks.setdefault(key, threading.Lock())
+
+    def read(self) -> Dict[str, Any]:
+        """
+        Read and parse the configuration file.
+
+        Returns:
+            dict: Parsed configuration
+
+        Raises:
+            ValueError: If the file does not contain valid JSON
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as exc:
+            raise ValueError(
+                f"Error: Invalid JSON in configuration file {self.path}"
+            ) from exc
+
+    def write(self, data: Dict[str, Any]) -> None:
+        """
+        Atomically replace the configuration file with `data`.
+
+        Args:
+            data (dict): Configuration to store
+        """
+        with self._lock:
+            self._write_unlocked(data)
+
+    def update(
+        self, mutate: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Read, modify and atomically rewrite the configuration under the lock.
+
+        Args:
+            mutate (callable): Receives the current configuration and either
+                modifies it in place or returns a replacement
+
+        Returns:
+            dict: The configuration that was written
+        """
+        with self._lock:
+            data = self.read()
+            updated = mutate(data)
+            if updated is not None:
+                data = updated
+            self._write_unlocked(data)
+            return data
+
+    async def read_async(self) -> Dict[str, Any]:
+        """Read the configuration in a worker thread."""
+        return await asyncio.to_thread(self.read)
+
+    async def write_async(self, data: Dict[str, Any]) -> None:
+        """Atomically write the configuration in a worker thread."""
+        await asyncio.to_thread(self.write, data)
+
+    async def update_async(
+        self, mutate: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Run `update` in a worker thread."""
+        return await asyncio.to_thread(self.update, mutate)
+
+    def _write_unlocked(self, data: Dict[str, Any]) -> None:
+        with atomic_write(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w", **kwargs):
+    """
+    Open a temporary file next to `path` and rename it over `path` on success.
+
+    The file is synced before the rename, and removed if the block raises,
+    so `path` only ever holds complete content.
+
+    Args:
+        path (str): Destination file
+        mode (str): Write mode, "w" or "wb"
+        **kwargs: Passed to `os.fdopen` (e.g. encoding)
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
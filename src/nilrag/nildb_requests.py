@@ -3,10 +3,12 @@ nilDB class for managing secure voting and storage with distributed nodes.
 """
 
 import asyncio
+import hashlib
 import time
+from collections import defaultdict
 from dataclasses import dataclass
 from http import HTTPStatus
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import uuid4
 
 import aiohttp
@@ -16,10 +18,14 @@ import numpy as np
 import requests
 from ecdsa import SECP256k1, SigningKey
 
+from nilrag.ballots import PLURALITY, vector_length
+
 # Constants
 TIMEOUT = 3600
 MAX_RETRIES = 3
 RETRY_DELAY = 1  # seconds
+# Extra time given to slow nodes holding shares still missing from a tally
+READ_GRACE = 2.0  # seconds
 
 @dataclass
 class Node:  # pylint: disable=too-few-public-methods
@@ -35,15 +41,18 @@ class Node:  # pylint: disable=too-few-public-methods
         org (str): The org identifier for this node
         bearer_token (str): Authentication token for API requests
         schema_id (str, optional): ID of the schema associated with this node
+        shard_schema_ids (list, optional): IDs of the shard schemas when the
+            election's ballots are spread over several schemas
     """
 
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
         self,
         url: str,
         node_id: Optional[str] = None,
         org: Optional[str] = None,
         bearer_token: Optional[str] = None,
         schema_id: Optional[str] = None,
+        shard_schema_ids: Optional[List[str]] = None,
     ):
         """
         Initialize a new Node instance.
@@ -52,6 +61,7 @@ class Node:  # pylint: disable=too-few-public-methods
             org (str): org identifier
             bearer_token (str): Authentication token
             schema_id (str, optional): Associated schema ID
+            shard_schema_ids (list, optional): Shard schema IDs, in shard order
 
         """
         self.url = url[:-1] if url.endswith("/") else url
@@ -59,6 +69,17 @@ class Node:  # pylint: disable=too-few-public-methods
         self.org = org
         self.bearer_token = bearer_token
         self.schema_id = schema_id
+        self.shard_schema_ids = shard_schema_ids
+
+    @property
+    def schema_ids(self) -> List[str]:
+        """
+        Returns:
+            list: Schema ID of every shard (a single schema when not sharded)
+        """
+        if self.shard_schema_ids:
+            return list(self.shard_schema_ids)
+        return [self.schema_id]
 
     def __repr__(self):
         """
@@ -70,6 +91,7 @@ class Node:  # pylint: disable=too-few-public-methods
             \n  org: {self.org}\
             \n  Bearer Token: {self.bearer_token}\
             \n  Schema ID: {self.schema_id}\
+            \n  Shard Schema IDs: {self.shard_schema_ids}\
 "
 
 
@@ -82,16 +104,28 @@ class NilDB:
 
     Attributes:
         nodes (list): List of Node instances representing the distributed nilDB nodes
+        threshold (int, optional): Number of nodes needed to reconstruct a vote
+            under t-of-n sharing. Without a threshold, additive sharing is used
+            and every node must take part in uploads and reads.
+        read_grace (float): Seconds tallies wait for slow nodes holding shares
+            still missing once enough nodes have answered
     """
 
-    def __init__(self, nodes: list[Node]):
+    def __init__(self, nodes: list[Node], threshold: Optional[int] = None):
         """
         Initialize NilDB with a list of nilDB nodes.
 
         Args:
             nodes (list): List of Node instances representing nilDB nodes
+            threshold (int, optional): Nodes needed to reconstruct a vote
         """
+        if threshold is not None and not 2 <= threshold <= len(nodes):
+            raise ValueError(
+                f"Threshold must be between 2 and {len(nodes)}, got {threshold}"
+            )
         self.nodes = nodes
+        self.threshold = threshold
+        self.read_grace = READ_GRACE
 
     def __repr__(self):
         """Return string representation of NilDB showing all nodes."""
@@ -99,19 +133,65 @@ class NilDB:
             f"\nNode({i}):\n{repr(node)}" for i, node in enumerate(self.nodes)
         )
 
-    async def init_schema(self, n_slots: int):
+    @property
+    def required_nodes(self) -> int:
+        """Number of nodes that must succeed for an upload or a read."""
+        return self.threshold or len(self.nodes)
+
+    @property
+    def n_shards(self) -> int:
+        """Number of shard schemas each node spreads the ballots over."""
+        return len(self.nodes[0].schema_ids)
+
+    def shard_for(self, voter_id: str) -> int:
+        """
+        Shard owning a voter's ballot.
+
+        The shard is derived from a stable hash of the voter ID, so every node
+        and every backend worker routes a voter to the same shard.
+
+        Args:
+            voter_id (str): Unique identifier of the voter
+
+        Returns:
+            int: Shard index in [0, n_shards)
+        """
+        digest = hashlib.sha256(voter_id.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % self.n_shards
+
+    async def init_schema(
+        self, n_slots: int, ballot_type: str = PLURALITY, n_shards: int = 1
+    ):
         """
         Initialize the nilDB schema across all nodes asynchronously.
 
-        Creates a schema for storing vote vectors where each vector has length equal to
-        the number of slots, and each entry corresponds to a slot (1 for selected, 0 otherwise).
+        Creates a schema for storing encoded ballots (see `nilrag.ballots`). For
+        plurality, approval and score ballots each vector has one entry per slot;
+        ranked ballots store an n_slots x n_slots position-count matrix. Every
+        vector ends with a ballot counter entry.
+
+        Args:
+            n_slots (int): Number of options in the election
+            ballot_type (str): One of `nilrag.ballots.BALLOT_TYPES`
+            n_shards (int): Number of schemas to spread the ballots over on
+                each node. With more than one shard, voters are routed by
+                `shard_for` and the shard IDs are stored in
+                `Node.shard_schema_ids`.
+
+        Returns:
+            str: ID of the (first) schema
 
         Raises:
-            ValueError: If schema creation fails on any nilDB node
+            ValueError: If schema creation fails on more nodes than the
+                threshold tolerates (any node without a threshold)
         """
-        schema_id = str(uuid4())
+        if n_shards < 1:
+            raise ValueError("n_shards must be at least 1")
+        shard_ids = [str(uuid4()) for _ in range(n_shards)]
+        schema_id = shard_ids[0]
+        n_entries = vector_length(ballot_type, n_slots)
 
-        async def create_schema_for_node(node: Node) -> None:
+        async def create_schema_for_node(node: Node, schema_id: str) -> None:
             url = node.url + "/schemas"
             headers = {
                 "Authorization": "Bearer " + str(node.bearer_token),
@@ -133,8 +213,8 @@ class NilDB:
                                 "description": "Vector representing the vote, where each entry corresponds to a slot",
                                 "type": "array",
                                 "items": {"type": "integer"},
-                                "minItems": n_slots,
-                                "maxItems": n_slots,
+                                "minItems": n_entries,
+                                "maxItems": n_entries,
                             },
                             "voter_id": {
                                 "type": "string",
@@ -160,7 +240,6 @@ class NilDB:
                                 raise ValueError(
                                     f"Error in POST request: {response.status}, {error_text}"
                                 )
-                            node.schema_id = schema_id
                             return
                 except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                     if attempt == MAX_RETRIES - 1:
@@ -169,10 +248,24 @@ class NilDB:
                         ) from e
                     await asyncio.sleep(RETRY_DELAY * (attempt + 1))
 
-        # Create schema on all nodes in parallel
-        tasks = [create_schema_for_node(node) for node in self.nodes]
-        await asyncio.gather(*tasks)
-        print(f"Schema {schema_id} created successfully.")
+        async def create_shards_for_node(node: Node) -> None:
+            await asyncio.gather(
+                *(create_schema_for_node(node, shard_id) for shard_id in shard_ids)
+            )
+
+        # Create every shard schema on all nodes in parallel
+        results = await asyncio.gather(
+            *(create_shards_for_node(node) for node in self.nodes),
+            return_exceptions=True,
+        )
+        self._check_quorum(results, "create schema")
+        for node in self.nodes:
+            node.schema_id = schema_id
+            node.shard_schema_ids = shard_ids if n_shards > 1 else None
+        if n_shards > 1:
+            print(f"Schemas {', '.join(shard_ids)} created successfully.")
+        else:
+            print(f"Schema {schema_id} created successfully.")
         return schema_id
 
     def generate_jwt(self, secret_key: str, ttl: int = 3600):
@@ -206,22 +299,28 @@ class NilDB:
         self,
         lst_vote_shares: list[list[int]],
         voter_id: str,
+        check_duplicate: bool = True,
     ) -> None:
         """
-        Upload vote shares (one-hot vector) to all nodes.
+        Upload vote shares (an encoded ballot) to all nodes.
 
         Args:
             lst_vote_shares (list): List of vote shares for each vote,
             voter_id (str): Unique identifier of the voter
+            check_duplicate (bool): Query the nodes for an earlier vote first.
+                Callers that already know the voter has not voted (e.g. from a
+                voter-ID filter miss) can skip this round trip.
         Raises:
             AssertionError: If number of embeddings and chunks don't match
-            ValueError: If upload fails on any nilDB node
+            ValueError: If upload fails on more nodes than the threshold
+                tolerates (any node without a threshold)
         """
 
-        if await self.has_voted(voter_id):
+        if check_duplicate and await self.has_voted(voter_id):
             raise ValueError(f"Voter {voter_id} has already voted.")
 
         vote_id = str(uuid4())
+        shard = self.shard_for(voter_id)
         tasks = []
         for node_idx, node in enumerate(self.nodes):
             data = []
@@ -235,11 +334,16 @@ class NilDB:
             }
             # Add this entry to the batch data
             data.append(entry)
-            tasks.append(upload_to_node(node, data))
+            tasks.append(upload_to_node(node, data, node.schema_ids[shard]))
+        results = await asyncio.gather(*tasks, return_exceptions=True)
         try:
-            results = await asyncio.gather(*tasks)
-            print(f"Successfully uploaded vote")
-            for result in results:
+            self._check_quorum(results, "upload vote")
+        except Exception as e:
+            print(f"Error uploading vote: {str(e)}")
+            raise
+        print(f"Successfully uploaded vote")
+        for result in results:
+            if not isinstance(result, BaseException):
                 print(
                     {
                         "status_code": 200,
@@ -247,13 +351,33 @@ class NilDB:
                         "response_json": result,
                     }
                 )
-        except Exception as e:
-            print(f"Error uploading vote: {str(e)}")
-            raise
+
+    def _check_quorum(self, results: list, action: str) -> None:
+        """
+        Raise unless enough per-node results succeeded.
+
+        Failed nodes are reported; with a threshold, up to n - threshold
+        failures are tolerated.
+        """
+        failures = [
+            (i, r) for i, r in enumerate(results) if isinstance(r, BaseException)
+        ]
+        for node_idx, error in failures:
+            print(f"Node {node_idx} failed to {action}: {error}")
+        if len(results) - len(failures) < self.required_nodes:
+            error = failures[0][1]
+            if isinstance(error, ValueError):
+                raise error
+            raise ValueError(f"Failed to {action}: {error}") from error
 
     async def has_voted(self, voter_id: str) -> bool:
         """
-        Check if a voter has already submitted a vote by querying any one node.
+        Check if a voter has already submitted a vote.
+
+        Only the shard owning the voter is queried, on every node in parallel.
+        The answer is True as soon as any node holds a vote of theirs, and
+        False once enough nodes to see every vote have answered without one
+        (a single node without a threshold, see `_query_nodes`).
 
         Args:
             voter_id (str): Unique identifier of the voter
@@ -261,28 +385,260 @@ class NilDB:
         Returns:
             bool: True if voter has already voted, False otherwise
         """
-        node = self.nodes[0]  # Use any node
-        url = node.url + "/data/read"
-        headers = {
-            "Authorization": "Bearer " + str(node.bearer_token),
-            "Content-Type": "application/json",
+        shard = self.shard_for(voter_id)
+
+        async def has_voted_on_node(node: Node) -> bool:
+            url = node.url + "/data/read"
+            headers = {
+                "Authorization": "Bearer " + str(node.bearer_token),
+                "Content-Type": "application/json",
+            }
+            payload = {
+                "schema": node.schema_ids[shard],
+                "filter": {"voter_id": voter_id},
+                "options": {"limit": 1}
+            }
+            async with aiohttp.ClientSession() as session:
+                async with session.post(url, headers=headers, json=payload) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        raise ValueError(f"Error checking voter: {response.status}, {error_text}")
+                    data = await response.json()
+                    return len(data.get("data", [])) > 0
+
+        return any(await self._query_nodes(has_voted_on_node, stop=bool))
+
+    async def _query_nodes(self, query, stop=None) -> list:
+        """
+        Run `query(node)` on every node in parallel and return the answers of
+        the first nodes to answer.
+
+        A stored vote is held by at least `required_nodes` nodes, so the
+        answers of any n - required_nodes + 1 nodes together see every vote.
+        The remaining queries are cancelled once that many nodes answered, or
+        as soon as an answer satisfies `stop`.
+
+        Args:
+            query (callable): Coroutine function run once per node
+            stop (callable, optional): Returns True for an answer that settles
+                the query on its own (e.g. a node holding the voter's vote)
+
+        Raises:
+            ValueError: If fewer nodes than that answer
+        """
+        needed = len(self.nodes) - self.required_nodes + 1
+        node_of = {
+            asyncio.create_task(query(node)): node_idx
+            for node_idx, node in enumerate(self.nodes)
+        }
+        pending = set(node_of)
+        answers = []
+        error = None
+        try:
+            while pending and len(answers) < needed:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    try:
+                        answer = task.result()
+                    except (ValueError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        print(f"Node {node_of[task]} did not answer: {e}")
+                        error = e
+                        continue
+                    answers.append(answer)
+                    if stop is not None and stop(answer):
+                        return answers
+        finally:
+            for task in pending:
+                task.cancel()
+        if len(answers) < needed:
+            raise ValueError(
+                f"Only {len(answers)} of the {needed} required nodes answered"
+            ) from error
+        return answers
+
+    async def read_voter_ids(self) -> List[str]:
+        """
+        List the IDs of all voters who have voted, reading every shard of
+        every node in parallel and merging the nodes' answers.
+
+        Returns:
+            list: Voter IDs
+        """
+
+        async def read_node_voter_ids(node: Node) -> List[str]:
+            results = await asyncio.gather(
+                *(read_from_node(node, {}, schema_id) for schema_id in node.schema_ids)
+            )
+            return [
+                record["voter_id"]
+                for records in results
+                for record in records
+                if "voter_id" in record
+            ]
+
+        by_node = await self._query_nodes(read_node_voter_ids)
+        return list(dict.fromkeys(voter_id for ids in by_node for voter_id in ids))
+
+    async def _read_node_votes(self, node: Node) -> Dict[str, List[int]]:
+        """Read a node's share vectors from all its shards, keyed by vote ID."""
+        results = await asyncio.gather(
+            *(read_from_node(node, {}, schema_id) for schema_id in node.schema_ids)
+        )
+        return {
+            vote["_id"]: vote.get("vote_vector", [])
+            for records in results
+            for vote in records
+            if "_id" in vote
         }
-        payload = {
-            "schema": node.schema_id,
-            "filter": {"voter_id": voter_id},
-            "options": {"limit": 1}
+
+    @staticmethod
+    def _join_node_votes(
+        by_node: List[Dict[str, List[int]]]
+    ) -> Dict[str, List[List[int]]]:
+        """Combine per-node reads, keeping the votes present on every node."""
+        common_ids = set(by_node[0]).intersection(*by_node[1:])
+        return {
+            vote_id: [node_votes[vote_id] for node_votes in by_node]
+            for vote_id in by_node[0]
+            if vote_id in common_ids
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=payload) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise ValueError(f"Error checking voter: {response.status}, {error_text}")
-                data = await response.json()
-                return len(data.get("data", [])) > 0
 
+    async def read_votes(self) -> Dict[str, List[List[int]]]:
+        """
+        Read every node's vote shares, fanning out over all nodes and shards
+        in parallel.
+
+        Returns:
+            dict: Maps each vote ID to its share vectors, one per node in node
+            order. Votes missing from any node are left out.
+
+        Raises:
+            ValueError: If reading fails on any nilDB node
+        """
+        by_node = await asyncio.gather(
+            *(self._read_node_votes(node) for node in self.nodes)
+        )
+        return self._join_node_votes(by_node)
+
+    async def read_vote_groups(
+        self,
+    ) -> List[Tuple[List[int], Dict[str, List[List[int]]]]]:
+        """
+        Read vote shares from the fastest nodes and group the votes by the
+        nodes whose shares reconstruct them.
+
+        Without a threshold there is a single group of all nodes (see
+        `read_votes`). With a threshold, each vote is reconstructed from the
+        first `threshold` answering nodes that hold it, which need not be the
+        same nodes for every vote, since uploads only need any `threshold`
+        nodes to succeed. Nodes still reading once every vote can be
+        reconstructed are cancelled (see `_read_answering_nodes`). Votes held
+        by fewer answering nodes (e.g. failed uploads) are skipped.
+
+        Returns:
+            list: (node indices, votes) pairs, where votes maps each vote ID
+            to its share vectors from those nodes, in that order
+
+        Raises:
+            ValueError: If fewer than `required_nodes` nodes answer
+        """
+        if self.threshold is None:
+            return [(list(range(len(self.nodes))), await self.read_votes())]
+
+        answered = await self._read_answering_nodes()
+        groups = defaultdict(dict)
+        incomplete = self._vote_holders(answered, groups)
+        if incomplete:
+            print(
+                f"Skipped {incomplete} votes held by fewer than {self.threshold} "
+                "answering nodes"
+            )
+        return [(list(node_indices), groups[node_indices]) for node_indices in sorted(groups)]
+
+    def _vote_holders(self, answered: Dict[int, Dict[str, List[int]]], groups=None) -> int:
+        """
+        Count the votes held by fewer than `threshold` of the answering nodes.
+
+        If `groups` is given, every other vote is added to it under the first
+        `threshold` nodes holding it, with their share vectors.
+        """
+        holders = defaultdict(list)
+        for node_idx, node_votes in sorted(answered.items()):
+            for vote_id in node_votes:
+                holders[vote_id].append(node_idx)
+        incomplete = 0
+        for vote_id, node_indices in holders.items():
+            if len(node_indices) < self.threshold:
+                incomplete += 1
+            elif groups is not None:
+                node_indices = tuple(node_indices[: self.threshold])
+                groups[node_indices][vote_id] = [
+                    answered[node_idx][vote_id] for node_idx in node_indices
+                ]
+        return incomplete
+
+    async def _read_answering_nodes(self) -> Dict[int, Dict[str, List[int]]]:
+        """
+        Read every node's votes in parallel, stopping early once complete.
+
+        Every stored vote is on at least `threshold` nodes, so once
+        max(threshold, n - threshold + 1) nodes have answered every vote has
+        been seen. Reading stops there if each seen vote is held by
+        `threshold` answering nodes. Otherwise the slower nodes get
+        `read_grace` more seconds to supply the missing shares, so a stalled
+        node delays a tally by at most that much.
 
-async def upload_to_node(node: Node, data: list[dict]):
-    """Upload a vote data to a specific node."""
+        Returns:
+            dict: Votes read from each answering node, keyed by node index
+
+        Raises:
+            ValueError: If fewer than `threshold` nodes answer
+        """
+        loop = asyncio.get_running_loop()
+        needed = max(self.threshold, len(self.nodes) - self.threshold + 1)
+        node_of = {
+            asyncio.create_task(self._read_node_votes(node)): node_idx
+            for node_idx, node in enumerate(self.nodes)
+        }
+        pending = set(node_of)
+        answered = {}
+        error = None
+        deadline = None
+        try:
+            while pending:
+                timeout = None if deadline is None else max(0.0, deadline - loop.time())
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    print(f"Stopped waiting for {len(pending)} slow nodes")
+                    break
+                for task in done:
+                    try:
+                        answered[node_of[task]] = task.result()
+                    except (ValueError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        print(f"Node {node_of[task]} failed to read votes: {e}")
+                        error = e
+                if len(answered) >= needed:
+                    if not self._vote_holders(answered):
+                        break
+                    if deadline is None:
+                        deadline = loop.time() + self.read_grace
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if len(answered) < self.threshold:
+            raise ValueError(
+                f"Only {len(answered)} of the {self.threshold} required nodes answered"
+            ) from error
+        return answered
+
+
+async def upload_to_node(node: Node, data: list[dict], schema_id: Optional[str] = None):
+    """Upload a vote data to a specific node (and schema, defaulting to the node's)."""
     url = node.url + "/data/create"
     headers = {
         "Authorization": "Bearer " + str(node.bearer_token),
@@ -290,7 +646,7 @@ async def upload_to_node(node: Node, data: list[dict]):
     }
 
     payload = {
-        "schema": node.schema_id,
+        "schema": schema_id or node.schema_id,
         "data": data,
     }
     async with aiohttp.ClientSession() as session:
@@ -301,3 +657,27 @@ async def upload_to_node(node: Node, data: list[dict]):
                     f"Error in POST request: {response.status}, {error_text}"
                 )
             return await response.json()
+
+
+async def read_from_node(
+    node: Node, data_filter: dict, schema_id: Optional[str] = None
+) -> list[dict]:
+    """Read the records matching a filter from a specific node (and schema)."""
+    url = node.url + "/data/read"
+    headers = {
+        "Authorization": "Bearer " + str(node.bearer_token),
+        "Content-Type": "application/json",
+    }
+    payload = {
+        "schema": schema_id or node.schema_id,
+        "filter": data_filter,
+    }
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, headers=headers, json=payload) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise ValueError(
+                    f"Error in POST request: {response.status}, {error_text}"
+                )
+            data = await response.json()
+            return data.get("data", [])
@@ -0,0 +1,261 @@
+"""
+Compact binary snapshots of an election's ballot shares.
+
+A snapshot holds every node's shares of every ballot so results can be
+recomputed offline. Layout (all integers little-endian):
+
+    magic        8 bytes   b"BVSNAP\\0\\0"
+    version      uint16
+    flags        uint16    bit 0: body is zlib-compressed
+    n_nodes      uint32
+    n_ballots    uint64
+    vector_len   uint32
+    meta_len     uint32
+    metadata     meta_len bytes of UTF-8 JSON, zero-padded to 8 bytes
+    body:
+        ballot ids   n_ballots x 16-byte UUIDs
+        shares       n_nodes x n_ballots x vector_len uint64
+
+Uncompressed snapshots are memory-mapped when read, so recounting a large
+election does not load it into memory up front.
+"""
+
+import json
+import struct
+import uuid
+import zlib
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from nilrag.config import atomic_write
+from nilrag.util import SHARE_MODULUS, reduce_share_vector
+
+MAGIC = b"BVSNAP\0\0"
+VERSION = 1
+FLAG_COMPRESSED = 0x1
+
+_HEADER = struct.Struct("<8sHHIQII")
+_SHARE_DTYPE = np.dtype("<u8")
+_ID_BYTES = 16
+
+
+@dataclass
+class Snapshot:  # pylint: disable=too-few-public-methods
+    """
+    Ballot shares loaded from a snapshot file.
+
+    Attributes:
+        metadata (dict): Election metadata (ballot type, slots, schema, ...)
+        ballot_ids (np.ndarray): (n_ballots, 16) uint8 array of vote UUIDs
+        shares (np.ndarray): (n_nodes, n_ballots, vector_len) uint64 shares
+    """
+
+    metadata: dict
+    ballot_ids: np.ndarray
+    shares: np.ndarray
+
+    @property
+    def vote_ids(self) -> List[str]:
+        """Vote IDs as UUID strings."""
+        return [str(uuid.UUID(bytes=bytes(row))) for row in self.ballot_ids]
+
+    def groups(self) -> List[Tuple[List[int], int, int]]:
+        """
+        Ballot ranges sharing the same source nodes.
+
+        With threshold sharing, each ballot is stored with the shares of the
+        nodes it was reconstructed from, and ballots are ordered by those
+        nodes (see `NilDB.read_vote_groups`).
+
+        Returns:
+            list: (node indices, first ballot, end ballot) per group
+        """
+        n_nodes, n_ballots, _ = self.shares.shape
+        if "groups" not in self.metadata:
+            return [(list(range(n_nodes)), 0, n_ballots)]
+        ranges = []
+        start = 0
+        for group in self.metadata["groups"]:
+            ranges.append((group["node_indices"], start, start + group["ballots"]))
+            start += group["ballots"]
+        return ranges
+
+    def node_totals(
+        self,
+        chunk_size: int = 1 << 16,
+        exclude: Iterable[str] = (),
+        ballots: slice = slice(None),
+    ) -> List[List[int]]:
+        """
+        Sum each node's shares over a range of ballots in the share domain.
+
+        Ballots are summed in chunks so memory-mapped snapshots are streamed
+        from disk rather than loaded whole.
+
+        Args:
+            chunk_size (int): Ballots summed per chunk
+            exclude (iterable): Vote IDs to leave out, e.g. invalid ballots
+            ballots (slice): Ballots to sum, all by default
+
+        Returns:
+            list: One aggregated share vector per node
+        """
+        n_nodes, _, vector_len = self.shares.shape
+        first, end, _ = ballots.indices(self.shares.shape[1])
+        totals = [[0] * vector_len for _ in range(n_nodes)]
+        exclude = set(exclude)
+        excluded = [
+            first + i
+            for i, row in enumerate(self.ballot_ids[first:end])
+            if exclude and str(uuid.UUID(bytes=bytes(row))) in exclude
+        ]
+        for node_idx in range(n_nodes):
+            for start in range(first, end, chunk_size):
+                chunk = self.shares[node_idx, start:min(start + chunk_size, end)]
+                # Shares are below 2**33, so a chunk sum cannot overflow uint64
+                partial = chunk.sum(axis=0, dtype=np.uint64) % SHARE_MODULUS
+                totals[node_idx] = [
+                    (t + int(p)) % SHARE_MODULUS
+                    for t, p in zip(totals[node_idx], partial)
+                ]
+            for i in excluded:
+                totals[node_idx] = [
+                    (t - int(v)) % SHARE_MODULUS
+                    for t, v in zip(totals[node_idx], self.shares[node_idx, i])
+                ]
+        return totals
+
+
+def write_snapshot(
+    path: str,
+    votes_by_id: Dict[str, List[List[int]]],
+    metadata: Optional[dict] = None,
+    compress: bool = False,
+) -> int:
+    """
+    Write ballot shares to a snapshot file.
+
+    The file is written to a temporary file in the same directory, synced
+    and renamed into place, so a partially written snapshot is never visible
+    and a failed write leaves no temporary file behind.
+
+    Args:
+        path (str): Destination file
+        votes_by_id (dict): Vote ID to share vectors, one per node (as
+            returned by `NilDB.read_votes`)
+        metadata (dict, optional): Election metadata stored with the shares
+        compress (bool): Compress the body with zlib
+
+    Returns:
+        int: Number of ballots written
+    """
+    vote_ids = list(votes_by_id)
+    n_ballots = len(vote_ids)
+    if n_ballots:
+        first = votes_by_id[vote_ids[0]]
+        n_nodes, vector_len = len(first), len(first[0])
+    else:
+        n_nodes = vector_len = 0
+
+    header = _header_bytes(metadata, compress, n_nodes, n_ballots, vector_len)
+    with atomic_write(path, "wb") as f:
+        f.write(header)
+        _write_body(f, votes_by_id, vote_ids, n_nodes, compress)
+    return n_ballots
+
+
+def _header_bytes(
+    metadata: Optional[dict], compress: bool, n_nodes: int, n_ballots: int, vector_len: int
+) -> bytes:
+    """Fixed header followed by the JSON metadata, padded to 8 bytes."""
+    meta = json.dumps(metadata or {}).encode("utf-8")
+    padding = -(_HEADER.size + len(meta)) % 8
+    flags = FLAG_COMPRESSED if compress else 0
+    header = _HEADER.pack(MAGIC, VERSION, flags, n_nodes, n_ballots, vector_len, len(meta))
+    return header + meta + b"\0" * padding
+
+
+def _write_body(
+    f: BinaryIO,
+    votes_by_id: Dict[str, List[List[int]]],
+    vote_ids: List[str],
+    n_nodes: int,
+    compress: bool,
+) -> None:
+    """Write the ballot-id index and the share arrays, node by node."""
+    compressor = zlib.compressobj() if compress else None
+
+    def emit(chunk: bytes) -> None:
+        f.write(compressor.compress(chunk) if compressor else chunk)
+
+    emit(b"".join(uuid.UUID(vote_id).bytes for vote_id in vote_ids))
+    for node_idx in range(n_nodes):
+        for chunk in _chunks(vote_ids, 1 << 14):
+            rows = [reduce_share_vector(votes_by_id[vote_id][node_idx]) for vote_id in chunk]
+            emit(np.asarray(rows, dtype=_SHARE_DTYPE).tobytes())
+    if compressor:
+        f.write(compressor.flush())
+
+
+def read_snapshot(path: str) -> Snapshot:
+    """
+    Open a snapshot file.
+
+    Uncompressed snapshots are memory-mapped; compressed ones are
+    decompressed into memory.
+
+    Args:
+        path (str): Snapshot file
+
+    Returns:
+        Snapshot: The snapshot's metadata, ballot IDs and shares
+
+    Raises:
+        ValueError: If the file is not a supported snapshot
+    """
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"Error: {path} is not a ballot snapshot")
+        magic, version, flags, n_nodes, n_ballots, vector_len, meta_len = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"Error: {path} is not a ballot snapshot")
+        if version != VERSION:
+            raise ValueError(f"Error: unsupported snapshot version {version}")
+        metadata = json.loads(f.read(meta_len).decode("utf-8") or "{}")
+        body_offset = _HEADER.size + meta_len + (-(_HEADER.size + meta_len) % 8)
+
+        if flags & FLAG_COMPRESSED:
+            f.seek(body_offset)
+            body = zlib.decompress(f.read())
+            ids = np.frombuffer(body, dtype=np.uint8, count=n_ballots * _ID_BYTES)
+            shares = np.frombuffer(
+                body, dtype=_SHARE_DTYPE, offset=n_ballots * _ID_BYTES
+            )
+        else:
+            if n_ballots == 0:
+                ids = np.zeros(0, dtype=np.uint8)
+                shares = np.zeros(0, dtype=_SHARE_DTYPE)
+            else:
+                ids = np.memmap(
+                    path, dtype=np.uint8, mode="r",
+                    offset=body_offset, shape=(n_ballots * _ID_BYTES,),
+                )
+                shares = np.memmap(
+                    path, dtype=_SHARE_DTYPE, mode="r",
+                    offset=body_offset + n_ballots * _ID_BYTES,
+                    shape=(n_nodes * n_ballots * vector_len,),
+                )
+
+    return Snapshot(
+        metadata=metadata,
+        ballot_ids=ids.reshape(n_ballots, _ID_BYTES),
+        shares=shares.reshape(n_nodes, n_ballots, vector_len),
+    )
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
@@ -2,7 +2,8 @@
 Utility functions for nilRAG.
 """
 
-from typing import Union
+import secrets
+from typing import Optional, Union
 
 import nilql
 
@@ -62,3 +63,171 @@ def decrypt_float_list(sk, lst: list[list]) -> list[float]:
         list: List of decrypted float values
     """
     return [from_fixed_point(nilql.decrypt(sk, l)) for l in lst]
+
+
+# Modulus of the field nilql uses for additive secret shares
+SHARE_MODULUS = (2**32) + 15
+
+
+def reduce_share_vector(vector: list) -> list[int]:
+    """
+    Map a share vector read from a node into the share field.
+
+    Nodes return whatever was stored, so entries are reduced modulo
+    SHARE_MODULUS as Python integers. Negative or oversized entries then
+    become ordinary field elements (failing validation if the ballot is
+    malformed) instead of overflowing or wrapping in fixed-width arrays.
+
+    Args:
+        vector (list): Share vector as stored on a node
+
+    Returns:
+        list: Entries in [0, SHARE_MODULUS)
+    """
+    return [int(x) % SHARE_MODULUS for x in vector]
+
+
+def encrypt_int_list(sk, lst: list[int]) -> list[list]:
+    """
+    Encrypt a list of integers using a secret key.
+
+    Args:
+        sk: Secret key for encryption
+        lst (list): List of integer values to encrypt
+
+    Returns:
+        list: List of encrypted values, one list of node shares per value
+    """
+    if isinstance(sk, ThresholdKey):
+        return [sk.encrypt(int(l)) for l in lst]
+    return [nilql.encrypt(sk, int(l)) for l in lst]
+
+
+def decrypt_int_list(sk, lst: list[list]) -> list[int]:
+    """
+    Decrypt a list of encrypted integer values.
+
+    Args:
+        sk: Secret key for decryption
+        lst (list): List of encrypted values, one list of node shares per value
+            (for a ThresholdKey, the shares of its `node_indices`)
+
+    Returns:
+        list: List of decrypted integer values
+    """
+    if isinstance(sk, ThresholdKey):
+        return [sk.decrypt(l) for l in lst]
+    return [nilql.decrypt(sk, l) for l in lst]
+
+
+def sum_share_vectors(vectors: list[list[int]]) -> list[int]:
+    """
+    Add share vectors element-wise in the share domain.
+
+    Additive and Shamir shares held by the same node can be summed across
+    ballots, so a node's summed vector is a share of the element-wise sum of
+    the ballots.
+
+    Args:
+        vectors (list): Share vectors of equal length held by one node
+
+    Returns:
+        list: Element-wise sum modulo SHARE_MODULUS
+    """
+    if not vectors:
+        return []
+    return [sum(column) % SHARE_MODULUS for column in zip(*vectors)]
+
+
+class ThresholdKey:
+    """
+    Key for t-of-n Shamir secret sharing of integers.
+
+    Shares live in the same field as nilql's additive shares and are linear,
+    so they can be summed per node exactly like additive shares. Any
+    `threshold` of the `n_nodes` shares reconstruct the value. The pinned
+    nilql release has no threshold mode, hence this key.
+
+    Attributes:
+        n_nodes (int): Number of nodes receiving a share
+        threshold (int): Number of shares needed to reconstruct
+        node_indices (list): Nodes whose shares `decrypt` expects, in order
+    """
+
+    def __init__(self, n_nodes: int, threshold: int, node_indices: list[int] = None):
+        # A single share would be the plaintext itself
+        if not 2 <= threshold <= n_nodes:
+            raise ValueError(f"Threshold must be between 2 and {n_nodes}, got {threshold}")
+        self.n_nodes = n_nodes
+        self.threshold = threshold
+        self.node_indices = (
+            list(range(n_nodes)) if node_indices is None else list(node_indices)
+        )
+        if len(self.node_indices) < threshold:
+            raise ValueError(
+                f"Need shares from {threshold} nodes, got {len(self.node_indices)}"
+            )
+        # Lagrange coefficients for interpolating at 0 from the first
+        # `threshold` nodes (evaluation point of node i is i + 1)
+        xs = [i + 1 for i in self.node_indices[:threshold]]
+        self._lagrange = []
+        for i, x_i in enumerate(xs):
+            num, den = 1, 1
+            for j, x_j in enumerate(xs):
+                if i != j:
+                    num = num * x_j % SHARE_MODULUS
+                    den = den * (x_j - x_i) % SHARE_MODULUS
+            self._lagrange.append(num * pow(den, -1, SHARE_MODULUS) % SHARE_MODULUS)
+
+    def for_nodes(self, node_indices: list[int]) -> "ThresholdKey":
+        """Key that decrypts shares coming from `node_indices`, in that order."""
+        return ThresholdKey(self.n_nodes, self.threshold, node_indices)
+
+    def encrypt(self, value: int) -> list[int]:
+        """
+        Split an integer into one share per node.
+
+        Raises:
+            ValueError: If the value is outside nilql's signed 32-bit range
+        """
+        if not -(2**31) <= value < 2**31 - 1:
+            raise ValueError("numeric plaintext must be a valid 32-bit signed integer")
+        coefficients = [value % SHARE_MODULUS] + [
+            secrets.randbelow(SHARE_MODULUS) for _ in range(self.threshold - 1)
+        ]
+        shares = []
+        for x in range(1, self.n_nodes + 1):
+            y = 0
+            for c in reversed(coefficients):
+                y = (y * x + c) % SHARE_MODULUS
+            shares.append(y)
+        return shares
+
+    def decrypt(self, shares: list[int]) -> int:
+        """
+        Reconstruct an integer from the shares of `node_indices`.
+
+        Only the first `threshold` shares are used.
+        """
+        value = sum(l * s for l, s in zip(self._lagrange, shares)) % SHARE_MODULUS
+        # Field elements in the upper half represent negative integers
+        if value > 2**31 - 1:
+            value -= SHARE_MODULUS
+        return value
+
+
+def generate_sum_key(n_nodes: int, threshold: Optional[int] = None):
+    """
+    Key for summable integer shares across `n_nodes` nodes.
+
+    Args:
+        n_nodes (int): Number of nodes
+        threshold (int, optional): Shares needed to reconstruct. Without a
+            threshold nilql's additive sharing is used, which needs every node.
+
+    Returns:
+        nilql.ClusterKey or ThresholdKey
+    """
+    if threshold is None:
+        return nilql.ClusterKey.generate({"nodes": [{}] * n_nodes}, {"sum": True})
+    return ThresholdKey(n_nodes, threshold)
@@ -0,0 +1,201 @@
+"""
+Aggregate validity checks for secret-shared ballots.
+
+Ballots are never decrypted individually. Random linear combinations of the
+ballot shares are formed over groups of ballots, each node's combined share
+is mapped through the linear validity constraints of the ballot type (see
+`nilrag.ballots.validity_constraints`), and only the resulting residuals are
+decrypted. A group of valid ballots always decrypts to zero residuals and a
+counter equal to the sum of the random coefficients, while a group holding an
+invalid ballot passes with probability at most 1 / SHARE_MODULUS. Failing
+groups are split in half and retested, so d invalid ballots among N are
+isolated with O(d log N) group decryptions.
+
+Only linear conditions can be checked this way. Range conditions (entries
+being 0/1, or within the score limit) are not: [6, -5, 0] passes as a
+plurality ballot, and approval and score ballots are only checked for their
+ballot counter. Those ranges are enforced by `encode_ballot` before a vote
+is shared.
+"""
+
+import secrets
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from nilrag.ballots import validity_constraints
+from nilrag.util import SHARE_MODULUS, decrypt_int_list, reduce_share_vector
+
+# Ballots combined per numpy pass. Coefficients are split into 17-bit limbs
+# and shares are below 2**33, so a chunk's limb products sum below 2**63.
+CHUNK_SIZE = 1 << 12
+_LIMB_BITS = 17
+
+
+def stack_shares(
+    votes_by_id: Dict[str, List[List[int]]]
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Arrange shares read from the nodes as a (nodes, ballots, vector_len) array.
+
+    Args:
+        votes_by_id (dict): Vote ID to share vectors, one per node (as
+            returned by `NilDB.read_votes`)
+
+    Returns:
+        tuple: (vote IDs in array order, uint64 share array)
+    """
+    vote_ids = list(votes_by_id)
+    shares = np.asarray(
+        [
+            [reduce_share_vector(vector) for vector in votes_by_id[vote_id]]
+            for vote_id in vote_ids
+        ],
+        dtype=np.uint64,
+    )
+    return vote_ids, shares.transpose(1, 0, 2)
+
+
+def find_invalid_ballots(
+    key,
+    ballot_type: str,
+    n_slots: int,
+    shares: np.ndarray,
+    vote_ids: Sequence[str],
+) -> List[str]:
+    """
+    Identify malformed ballots by batched group testing on their shares.
+
+    Every round tests all pending groups of ballots and decrypts their
+    combined residuals in one batch; groups that fail are split in half for
+    the next round. Valid ballots in a failing group reveal nothing, since
+    their residuals are zero. Shares are read in chunks, so a memory-mapped
+    array is streamed rather than loaded.
+
+    Args:
+        key: Key able to decrypt the ballot shares
+        ballot_type (str): One of `nilrag.ballots.BALLOT_TYPES`
+        n_slots (int): Number of options in the election
+        shares (np.ndarray): (n_nodes, n_ballots, vector_len) share array
+        vote_ids (sequence): Vote ID of each ballot, in array order
+
+    Returns:
+        list: IDs of the ballots that violate the validity constraints
+    """
+    if len(vote_ids) == 0:
+        return []
+
+    start_time = time.time()
+    constraints = validity_constraints(ballot_type, n_slots)
+    invalid = []
+    pending = [(0, len(vote_ids))]
+    rounds = 0
+    decryptions = 0
+    while pending:
+        rounds += 1
+        failed = _failing_groups(key, constraints, shares, pending)
+        decryptions += len(pending)
+        pending = []
+        for start, end in failed:
+            if end - start == 1:
+                invalid.append(vote_ids[start])
+            else:
+                middle = (start + end) // 2
+                pending.extend([(start, middle), (middle, end)])
+
+    print(
+        f"Validated {len(vote_ids)} ballots with {decryptions} group decryptions "
+        f"in {rounds} rounds ({time.time() - start_time:.2f} seconds), "
+        f"{len(invalid)} invalid"
+    )
+    return invalid
+
+
+def combine_shares(
+    shares: np.ndarray, start: int, coefficients: List[int]
+) -> List[List[int]]:
+    """
+    Random linear combination of consecutive ballots, per node.
+
+    Args:
+        shares (np.ndarray): (n_nodes, n_ballots, vector_len) share array
+        start (int): Index of the first ballot combined
+        coefficients (list): One coefficient per ballot from `start` on
+
+    Returns:
+        list: Each node's share of sum(coefficient * ballot), mod SHARE_MODULUS
+    """
+    mask = (1 << _LIMB_BITS) - 1
+    low = np.array([c & mask for c in coefficients], dtype=np.uint64)
+    high = np.array([c >> _LIMB_BITS for c in coefficients], dtype=np.uint64)
+    combined = []
+    for node_shares in shares:
+        total = [0] * node_shares.shape[1]
+        for offset in range(0, len(coefficients), CHUNK_SIZE):
+            stop = min(offset + CHUNK_SIZE, len(coefficients))
+            chunk = np.asarray(
+                node_shares[start + offset:start + stop], dtype=np.uint64
+            )
+            parts = (low[offset:stop] @ chunk, high[offset:stop] @ chunk)
+            total = [
+                (t + int(lo) + (int(hi) << _LIMB_BITS)) % SHARE_MODULUS
+                for t, lo, hi in zip(total, *parts)
+            ]
+        combined.append(total)
+    return combined
+
+
+def _residuals(constraints: List[List[int]], combined: List[int]) -> List[int]:
+    """Constraint residuals of one node's combined share, then its counter."""
+    return [
+        sum(a * s for a, s in zip(row, combined) if a) % SHARE_MODULUS
+        for row in constraints
+    ] + [combined[-1]]
+
+
+def _group_residuals(
+    constraints: List[List[int]], shares: np.ndarray, start: int, end: int
+) -> Tuple[List[List[int]], int]:
+    """
+    Combine one ballot range with fresh random coefficients.
+
+    Returns the residual shares (one list of node shares per value) and the
+    counter the group must decrypt to if all its ballots are valid.
+    """
+    coefficients = [secrets.randbelow(SHARE_MODULUS - 1) + 1 for _ in range(end - start)]
+    per_node = [
+        _residuals(constraints, combined)
+        for combined in combine_shares(shares, start, coefficients)
+    ]
+    return list(map(list, zip(*per_node))), sum(coefficients) % SHARE_MODULUS
+
+
+def _failing_groups(
+    key,
+    constraints: List[List[int]],
+    shares: np.ndarray,
+    groups: List[Tuple[int, int]],
+) -> List[Tuple[int, int]]:
+    """Test a batch of ballot ranges at once and return the ones that fail."""
+    flat = []
+    expected_counters = []
+    for start, end in groups:
+        residuals, expected = _group_residuals(constraints, shares, start, end)
+        flat.extend(residuals)
+        expected_counters.append(expected)
+
+    # Decrypt every group's combined residuals in a single batch
+    decrypted = decrypt_int_list(key, flat)
+    width = len(constraints) + 1
+    failed = []
+    for i, (group, expected) in enumerate(zip(groups, expected_counters)):
+        if not _group_passes(decrypted[i * width:(i + 1) * width], expected):
+            failed.append(group)
+    return failed
+
+
+def _group_passes(values: List[int], expected_counter: int) -> bool:
+    """True if a group's residuals are all zero and its counter matches."""
+    residuals_ok = all(value % SHARE_MODULUS == 0 for value in values[:-1])
+    return residuals_ok and (values[-1] - expected_counter) % SHARE_MODULUS == 0